@@ -0,0 +1,75 @@
+"""Time-to-first-token of back-to-back requests: bare requests.post vs the pooled client.
+
+Run inside Blender (or with the ``bpy`` module installed):
+
+    blender --background --python benchmarks/bench_client_ttft.py
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from mock_server import MockChatServer
+from source import client
+
+REQUESTS = 20
+# Simulated TCP+TLS handshake cost of a remote provider
+CONNECT_DELAY = 0.05
+
+
+def first_token(lines):
+    for line in lines:
+        if line.startswith(b"data:"):
+            return
+
+
+def bare_request(prefs, payload):
+    return requests.post(prefs.api_url, headers=client.build_headers(prefs),
+                         json=payload, timeout=(prefs.connect_timeout, prefs.read_timeout), stream=True)
+
+
+def pooled_request(prefs, payload):
+    return client.post_chat(prefs, payload, stream=True)
+
+
+def bench(send, prefs):
+    payload = {"model": "mock", "messages": [], "stream": True}
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = send(prefs, payload)
+        lines = response.iter_lines()
+        first_token(lines)
+        timings.append(time.perf_counter() - start)
+        # Drain the rest so the connection can go back to the pool
+        for _ in lines:
+            pass
+        response.close()
+    return timings
+
+
+def main():
+    with MockChatServer(connect_delay=CONNECT_DELAY) as server:
+        prefs = SimpleNamespace(api_url=server.url, api_key="mock", connect_timeout=5.0,
+                                read_timeout=30.0, pool_size=4)
+
+        bare = bench(bare_request, prefs)
+        bare_connections = server.connections
+
+        client.warm_up(server.url)
+        time.sleep(CONNECT_DELAY * 4)
+        pooled = bench(pooled_request, prefs)
+        pooled_connections = server.connections - bare_connections
+        client.close_all()
+
+    print(f"{REQUESTS} back-to-back requests, {CONNECT_DELAY * 1000:.0f} ms simulated handshake")
+    for name, timings, connections in (("bare", bare, bare_connections), ("pooled", pooled, pooled_connections)):
+        mean = sum(timings) / len(timings) * 1000
+        print(f"{name:>7}: mean TTFT {mean:7.2f} ms, first {timings[0] * 1000:7.2f} ms, {connections} connections")
+
+
+if __name__ == "__main__":
+    main()
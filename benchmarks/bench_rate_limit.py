@@ -0,0 +1,96 @@
+"""Requests under a shared API quota: no retries vs retries vs the rate limiter.
+
+A burst of requests goes through the worker loop at once to a mock
+endpoint that admits QUOTA requests per WINDOW seconds and answers 429
+with a Retry-After to the rest, like a quota shared by a team. A second
+burst of prompts larger than the tokens/min bucket checks that the
+tokens/min limit holds for them too.
+
+Run inside Blender (or with the ``bpy`` module installed):
+
+    blender --background --python benchmarks/bench_rate_limit.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockChatServer
+from source import batch, ratelimit, tracing, workers
+from source.config import CHARS_PER_TOKEN
+from source.response_cache import CacheRecorder
+
+REQUESTS = 120
+QUOTA = (50, 10.0)
+PAYLOAD = {"model": "mock", "stream": True, "max_tokens": 50,
+           "messages": [{"role": "user", "content": "x = 1\n" * 100}]}
+# Tokens/min limit, and prompts of 2.5 seconds' worth of it: larger than the bucket
+TOKENS_PER_MINUTE = 1200000
+LARGE_REQUESTS = 5
+LARGE_PAYLOAD = {"model": "mock", "stream": True, "max_tokens": 50,
+                 "messages": [{"role": "user", "content": "x" * (TOKENS_PER_MINUTE // 24 * CHARS_PER_TOKEN)}]}
+
+
+def bench(server, **settings):
+    ratelimit.clear()
+    server.admitted.clear()
+    server.throttled = 0
+    prefs = batch.batch_settings(api_url=server.url, api_key="mock", response_cache='OFF', **settings)
+    prefs.pool_size = REQUESTS
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        futures = [workers.submit(batch.fetch, prefs, PAYLOAD, CacheRecorder(None, None), tracing.Trace('BENCH'))
+                   for _ in range(REQUESTS)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in results if result.error is None)
+    return ok, server.throttled, elapsed
+
+
+def bench_large(server):
+    """Tokens/min actually sent for prompts larger than the bucket"""
+    ratelimit.clear()
+    server.admitted.clear()
+    prefs = batch.batch_settings(api_url=server.url, api_key="mock", response_cache='OFF',
+                                 rate_limit_tpm=TOKENS_PER_MINUTE)
+    prefs.pool_size = LARGE_REQUESTS
+    with contextlib.redirect_stdout(io.StringIO()):
+        futures = [workers.submit(batch.fetch, prefs, LARGE_PAYLOAD, CacheRecorder(None, None), tracing.Trace('BENCH'))
+                   for _ in range(LARGE_REQUESTS)]
+        for future in futures:
+            future.result()
+    sent = sorted(server.admitted)
+    tokens = ratelimit.estimate_tokens(LARGE_PAYLOAD)
+    # The first request is the burst the bucket allows; the rest must keep to the rate
+    return tokens * (len(sent) - 1) / (sent[-1] - sent[0]) * 60
+
+
+def main():
+    limit, window = QUOTA
+    rpm = int(limit * 60 / window)
+    runners = [
+        ("no retries", dict(max_retries=0)),
+        ("retries", dict(max_retries=3)),
+        (f"retries + {rpm} req/min", dict(max_retries=3, rate_limit_rpm=rpm)),
+    ]
+    print(f"{REQUESTS} requests at once, quota {limit} per {window:.0f}s")
+    print(f"{'client':<24} {'ok':>4} {'failed':>6} {'429s':>5} {'seconds':>8} {'ok/s':>6}")
+    with MockChatServer(quota=QUOTA) as server:
+        for name, settings in runners:
+            ok, throttled, elapsed = bench(server, **settings)
+            print(f"{name:<24} {ok:>4} {REQUESTS - ok:>6} {throttled:>5} {elapsed:>8.2f} {ok / elapsed:>6.2f}")
+
+    tokens = ratelimit.estimate_tokens(LARGE_PAYLOAD)
+    print(f"\n{LARGE_REQUESTS} requests of {tokens} tokens at once, limit {TOKENS_PER_MINUTE} tokens/min")
+    with MockChatServer(quota=(LARGE_REQUESTS, 3600.0)) as server:
+        rate = bench_large(server)
+    verdict = "within the limit" if rate <= TOKENS_PER_MINUTE * 1.01 else "OVER THE LIMIT"
+    print(f"sent {rate:,.0f} tokens/min, {verdict}")
+    workers.stop()
+
+
+if __name__ == "__main__":
+    main()
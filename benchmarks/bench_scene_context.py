@@ -0,0 +1,101 @@
+"""Scene summary cost on synthetic scenes: legacy multi-pass loop vs the snapshot cache.
+
+Run inside Blender (or with the ``bpy`` module installed):
+
+    blender --background --python benchmarks/bench_scene_context.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bpy
+from source import scene_context
+
+SIZES = (10, 100, 1000, 10000, 100000)
+MAX_LISTED = 20
+
+
+def legacy_scene_context(context):
+    # The pre-snapshot implementation: four passes, select_get() on every
+    # object and every mesh listed by name
+    scene = context.scene
+    scene_info = [f"Blender Version: {bpy.app.version_string}"]
+    scene_info.append(f"\nScene Name: {scene.name}")
+    scene_info.append(f"Total Objects: {len(scene.objects)}")
+    selected_objects = [obj for obj in scene.objects if obj.select_get()]
+    scene_info.append(f"Selected Objects: {len(selected_objects)}")
+    scene_info.append(f"Selected Objects: {[obj.name for obj in selected_objects]}")
+    cameras = [obj for obj in scene.objects if obj.type == 'CAMERA']
+    scene_info.append(f"\nCameras ({len(cameras)}):")
+    for obj in cameras:
+        cam = obj.data
+        scene_info.append(f"- {obj.name}: {cam.type} (Focal: {cam.lens}mm, "
+                          f"Clip: {cam.clip_start}-{cam.clip_end}m)")
+    lights = [obj for obj in scene.objects if obj.type == 'LIGHT']
+    scene_info.append(f"\nLights ({len(lights)}):")
+    for obj in lights:
+        light = obj.data
+        scene_info.append(f"- {obj.name}: {light.type} (Power: {light.energy}W, "
+                          f"Color: {tuple(round(c, 2) for c in light.color)})")
+    meshes = [obj for obj in scene.objects if obj.type == 'MESH']
+    scene_info.append(f"\nMeshes ({len(meshes)}):")
+    for obj in meshes:
+        scene_info.append(f"- {obj.name}")
+    scene_info.append("\nRender Settings:")
+    scene_info.append(f"- Engine: {scene.render.engine}")
+    return '\n'.join(scene_info)
+
+
+def populate(scene, total):
+    """Grow the scene to total objects: mostly meshes, a few lights, spread over collections"""
+    mesh = bpy.data.meshes.get("bench_mesh") or bpy.data.meshes.new("bench_mesh")
+    light = bpy.data.lights.get("bench_light") or bpy.data.lights.new("bench_light", 'POINT')
+    collections = [c for c in scene.collection.children if c.name.startswith("bench_")]
+    while len(collections) < 8:
+        collection = bpy.data.collections.new(f"bench_{len(collections)}")
+        scene.collection.children.link(collection)
+        collections.append(collection)
+
+    for i in range(len(scene.objects), total):
+        data = light if i % 500 == 0 else mesh
+        obj = bpy.data.objects.new(f"obj_{i}", data)
+        collections[i % len(collections)].objects.link(obj)
+        if i % 10 == 0:
+            obj.select_set(True)
+
+
+def timed(func, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    context = bpy.context
+    scene = context.scene
+    print(f"{'objects':>8} {'legacy (ms)':>12} {'cold (ms)':>10} {'warm (ms)':>10} "
+          f"{'legacy chars':>13} {'snapshot chars':>15}")
+    for size in SIZES:
+        populate(scene, size)
+        context.view_layer.update()
+
+        legacy, legacy_text = timed(lambda: legacy_scene_context(context), repeat=1)
+
+        def cold():
+            scene_context._snapshots.clear()
+            return scene_context.get_scene_context(context, MAX_LISTED)
+
+        cold_time, text = timed(cold)
+        warm_time, _ = timed(lambda: scene_context.get_scene_context(context, MAX_LISTED))
+        print(f"{len(scene.objects):>8} {legacy * 1000:>12.2f} {cold_time * 1000:>10.2f} "
+              f"{warm_time * 1000:>10.2f} {len(legacy_text):>13} {len(text):>15}")
+
+
+if __name__ == "__main__":
+    main()
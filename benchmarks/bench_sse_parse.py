@@ -0,0 +1,128 @@
+"""SSE parse throughput: the old iter_lines loop vs the incremental parser.
+
+Both run through requests' own iter_content over a fake socket that hands
+out one network read at a time, like a local model streaming hundreds of
+tokens per second (one event per read) or a bursty remote one (many events
+per read). The incremental parser is timed with the stdlib json decoder
+and, when installed, with orjson.
+
+Run inside Blender (or with the ``bpy`` module installed):
+
+    blender --background --python benchmarks/bench_sse_parse.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from source import streaming
+
+EVENTS = 100_000
+REPEAT = 3
+
+
+class FakeRaw:
+    """Socket stand-in: every read returns at most one network chunk"""
+    chunked = True
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, amt=None, decode_content=None):
+        for chunk in self.chunks:
+            if amt is None:
+                yield chunk
+            else:
+                for i in range(0, len(chunk), amt):
+                    yield chunk[i:i + amt]
+
+
+def make_response(chunks):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.raw = FakeRaw(chunks)
+    return response
+
+
+def make_chunks(events_per_read):
+    events = []
+    for i in range(EVENTS):
+        token = f"x{i % 97} = {i}\n" if i % 8 == 0 else f"tok{i % 13}"
+        chunk = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "model": "deepseek-chat",
+                 "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+        events.append(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+    events.append(b"data: [DONE]\n\n")
+    return [b"".join(events[i:i + events_per_read]) for i in range(0, len(events), events_per_read)]
+
+
+def legacy_events(response):
+    # What iter_stream_events used to do
+    for line in response.iter_lines():
+        if not line:
+            continue
+        decoded_line = line.decode('utf-8')
+        if not decoded_line.startswith('data:'):
+            continue
+        data = decoded_line[5:].strip()
+        if data == '[DONE]':
+            yield ('done', None)
+            continue
+        chunk = json.loads(data)
+        if not chunk['choices']:
+            continue
+        delta = chunk['choices'][0]['delta']
+        if delta.get('reasoning_content'):
+            yield ('reasoning', delta['reasoning_content'])
+        if delta.get('content'):
+            yield ('content', delta['content'])
+
+
+def incremental_events(response):
+    return streaming.iter_stream_events(response)
+
+
+def bench(parse, chunks, loads=None):
+    previous = streaming._json_loads
+    if loads is not None:
+        streaming._json_loads = loads
+    try:
+        elapsed = float('inf')
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                count = sum(1 for _ in parse(make_response(chunks)))
+                elapsed = min(elapsed, time.perf_counter() - start)
+    finally:
+        streaming._json_loads = previous
+    assert count == EVENTS + 1, count
+    return elapsed
+
+
+def main():
+    runners = [("iter_lines + json", legacy_events, None),
+               ("incremental + json", incremental_events, streaming._stdlib_json_loads)]
+    try:
+        import orjson
+        runners.append(("incremental + orjson", incremental_events, orjson.loads))
+    except ImportError:
+        print("orjson not installed, skipping the fast decoder")
+
+    print(f"{EVENTS} content events")
+    print(f"{'events/read':>12} {'parser':<22} {'events/s':>12} {'us/event':>9} {'speedup':>8}")
+    for events_per_read in (1, 4, 32):
+        chunks = make_chunks(events_per_read)
+        baseline = None
+        for name, parse, loads in runners:
+            elapsed = bench(parse, chunks, loads)
+            baseline = baseline or elapsed
+            print(f"{events_per_read:>12} {name:<22} {EVENTS / elapsed:>12,.0f} "
+                  f"{elapsed / EVENTS * 1e6:>9.2f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare full-buffer rebuilds with delta appends when streaming into a Text block.
+
+Run inside Blender (or with the ``bpy`` module installed):
+
+    blender --background --python benchmarks/bench_stream_apply.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bpy
+from source.streaming import TextStreamWriter
+
+
+def make_script(lines):
+    return '\n'.join(f"value_{i} = bpy.data.objects.get('Cube_{i}')" for i in range(lines))
+
+
+def make_fragments(tokens):
+    fragments = ["```python\n"]
+    for i in range(tokens):
+        fragments.append(f"x{i % 97}" if i % 8 else " = 1\n")
+    fragments.append("\n```")
+    return fragments
+
+
+def legacy_clean(response):
+    response = re.sub(r'\bNone\b', '', response)
+    response = re.sub(r'```\w*\s*', '', response, flags=re.MULTILINE)
+    response = re.sub(r'\n{3,}', '\n\n', response)
+    return response.strip()
+
+
+def run_legacy(text_block, original, fragments):
+    # What modal used to do: rebuild and re-clean everything for every chunk
+    buffer = ""
+    for fragment in fragments:
+        buffer += fragment
+        text_block.from_string(legacy_clean(original + "\n\n# Code:\n" + buffer))
+
+
+def run_delta(text_block, original, fragments):
+    writer = TextStreamWriter(text_block)
+    for fragment in fragments:
+        writer.feed('content', fragment)
+        writer.flush()
+    writer.finish()
+
+
+def bench(runner, script_lines, tokens):
+    original = make_script(script_lines)
+    fragments = make_fragments(tokens)
+    text_block = bpy.data.texts.new("bench")
+    text_block.from_string(original)
+    start = time.perf_counter()
+    runner(text_block, original, fragments)
+    elapsed = time.perf_counter() - start
+    bpy.data.texts.remove(text_block)
+    return elapsed
+
+
+def main():
+    script_lines = 5000
+    print(f"Script: {script_lines} lines")
+    print(f"{'tokens':>8} {'legacy (s)':>12} {'delta (s)':>12} {'speedup':>9}")
+    for tokens in (250, 500, 1000, 2000):
+        legacy = bench(run_legacy, script_lines, tokens)
+        delta = bench(run_delta, script_lines, tokens)
+        print(f"{tokens:>8} {legacy:>12.3f} {delta:>12.4f} {legacy / delta:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Benchmark suite for the add-on's hot paths, with machine-readable results.
+
+Runs inside Blender, with the ``bpy`` module installed, or anywhere with
+the bundled bpy stub (``--stub``, also used when bpy cannot be imported):
+
+    blender --background --python benchmarks/bench_suite.py -- --output results.json
+    python benchmarks/bench_suite.py --stub --output results.json --baseline previous.json
+
+Measures SSE parse throughput (in memory and through stream_generation
+against the mock server), the cost of one modal apply tick, the scene
+summary on synthetic scenes, and end-to-end time to first token and
+total time with the modal loop driven like Blender's timer would. With
+``--baseline`` the run is compared to an earlier results file and exits
+with status 1 when a result regressed past ``--threshold``.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import bpy_stub
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Benchmark suite for the DeepSeek add-on")
+    parser.add_argument("--stub", action='store_true', help="Use the bpy stub even if bpy is available")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare with an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--quick", action='store_true', help="Smaller sizes, for a fast smoke run")
+    return parser.parse_args(argv)
+
+
+ARGS = parse_args()
+bpy = bpy_stub.install(force=ARGS.stub)
+
+from mock_server import MockChatServer, split_text
+from source import batch, jobs
+from source.operators.autocomplete import DEEPSEEK_OT_AutoComplete
+from source.operators.fim_complete import DEEPSEEK_OT_FimComplete
+from source.response_cache import CacheRecorder
+from source.scene_context import get_scene_context, _snapshots
+from source.scheduler import ApplyScheduler
+from source.streaming import TextStreamWriter, iter_stream_events
+
+results = []
+
+
+def record(name, metric, value, unit, better, **params):
+    results.append({"name": name, "params": params, "metric": metric,
+                    "value": value, "unit": unit, "better": better})
+    shown = ", ".join(f"{key}={value}" for key, value in params.items())
+    # The add-on's own console output is silenced while benchmarks run
+    print(f"{name:<28} {shown:<34} {metric:<12} {value:>12.4f} {unit}", file=sys.__stdout__)
+
+
+class FakeResponse:
+    """In-memory SSE body with the iter_content interface of requests, one event per read"""
+
+    def __init__(self, reads):
+        self.reads = reads
+
+    def iter_content(self, chunk_size=None):
+        return iter(self.reads)
+
+
+def sse_reads(chunks, reasoning=()):
+    reads = []
+    for key, chunk in [("reasoning_content", c) for c in reasoning] + [("content", c) for c in chunks]:
+        reads.append(b"data: " + json.dumps({"choices": [{"index": 0, "delta": {key: chunk}}]}).encode() + b"\n\n")
+    reads.append(b"data: [DONE]\n\n")
+    return reads
+
+
+def sample_code(chars):
+    line = "obj = bpy.data.objects.new('Cube', mesh)  # add the object\n"
+    return (line * (chars // len(line) + 1))[:chars]
+
+
+def fake_context(text_block, prefs):
+    """Just enough of bpy.context for the autocomplete operator outside the UI"""
+    window_manager = types.SimpleNamespace(
+        event_timer_add=lambda interval, window=None: object(),
+        event_timer_remove=lambda timer: None,
+        modal_handler_add=lambda operator: None,
+    )
+    return types.SimpleNamespace(
+        space_data=types.SimpleNamespace(text=text_block),
+        area=types.SimpleNamespace(tag_redraw=lambda: None),
+        window=None,
+        window_manager=window_manager,
+        scene=bpy.context.scene,
+        view_layer=bpy.context.view_layer,
+        preferences=types.SimpleNamespace(addons={"source": types.SimpleNamespace(preferences=prefs)}),
+    )
+
+
+def bind_operator(cls):
+    """The operator's methods bound to a plain object, so no registration is needed"""
+    operator = types.SimpleNamespace(reports=[])
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, types.FunctionType):
+                setattr(operator, name, types.MethodType(value, operator))
+            elif isinstance(value, staticmethod):
+                setattr(operator, name, value.__func__)
+    operator.report = lambda level, message: operator.reports.append((level, message))
+    operator.job = operator.writer = operator.scheduler = operator.usage_tokens = None
+    return operator
+
+
+def bench_settings(url, **overrides):
+    return batch.batch_settings(api_url=url, api_key="mock", response_cache='OFF', hedge_mode='OFF',
+                                api_context_tokens=0, session_tokens=0, debounce_ms=0, **overrides)
+
+
+def bench_parse(quick):
+    total = 50_000 if quick else 400_000
+    code = sample_code(total)
+    for size in (1, 4, 16, 64):
+        reads = sse_reads(split_text(code, size))
+        start = time.perf_counter()
+        events = sum(1 for _ in iter_stream_events(FakeResponse(reads)))
+        elapsed = time.perf_counter() - start
+        record("parse.iter_stream_events", "throughput", total / elapsed / 1e6, "MB/s", "higher", chunk_chars=size)
+        record("parse.iter_stream_events", "events", events / elapsed, "events/s", "higher", chunk_chars=size)
+
+
+def bench_stream_generation(quick):
+    total = 20_000 if quick else 100_000
+    code = sample_code(total)
+    for size in (4, 64):
+        chunks = split_text(code, size)
+        with MockChatServer(chunks, reasoning=split_text("Thinking about it. " * 20, 8)) as server:
+            prefs = bench_settings(server.url)
+            job = jobs.Job('BENCH', size)
+            start = time.perf_counter()
+            DEEPSEEK_OT_AutoComplete.stream_generation(job, prefs, {"stream": True}, CacheRecorder(None, None))
+            elapsed = time.perf_counter() - start
+        record("parse.stream_generation", "throughput", total / elapsed / 1e6, "MB/s", "higher", chunk_chars=size)
+
+
+def bench_apply_tick(quick):
+    script = sample_code(100_000 if quick else 400_000)
+    ticks = 50 if quick else 200
+    for per_tick in (1, 10, 100):
+        text_block = bpy.data.texts.new("bench_apply")
+        text_block.from_string(script)
+        prefs = bench_settings("http://127.0.0.1:9/")
+        context = fake_context(text_block, prefs)
+        operator = bind_operator(DEEPSEEK_OT_AutoComplete)
+        operator.job = jobs.Job('BENCH', per_tick)
+        operator.writer = TextStreamWriter(text_block)
+        operator.answer = []
+        operator.scheduler = ApplyScheduler(operator.job.queue, prefs.frame_budget_ms)
+        operator.scheduler.start(context)
+
+        timer = types.SimpleNamespace(type='TIMER')
+        fragment = "value = bpy.context.object\n"
+        timings = []
+        for _ in range(ticks):
+            for _ in range(per_tick):
+                operator.job.put(('content', fragment))
+            start = time.perf_counter()
+            operator.modal(context, timer)
+            timings.append(time.perf_counter() - start)
+        bpy.data.texts.remove(text_block)
+
+        timings.sort()
+        record("apply.modal_tick", "mean", statistics.fmean(timings) * 1000, "ms", "lower", fragments=per_tick)
+        record("apply.modal_tick", "p95", timings[int(0.95 * (len(timings) - 1))] * 1000, "ms", "lower",
+               fragments=per_tick)
+
+
+def populate_scene(total):
+    """Grow the current scene to total objects: mostly meshes, some lights, a camera"""
+    scene = bpy.context.scene
+    mesh = bpy.data.meshes.get("bench_mesh") or bpy.data.meshes.new("bench_mesh")
+    light = bpy.data.lights.get("bench_light") or bpy.data.lights.new("bench_light", 'POINT')
+    camera = bpy.data.cameras.get("bench_camera") or bpy.data.cameras.new("bench_camera")
+    collections = [c for c in scene.collection.children if c.name.startswith("bench_")]
+    while len(collections) < 8:
+        collection = bpy.data.collections.new(f"bench_{len(collections)}")
+        scene.collection.children.link(collection)
+        collections.append(collection)
+
+    for i in range(len(scene.objects), total):
+        data = camera if i == 0 else light if i % 500 == 1 else mesh
+        obj = bpy.data.objects.new(f"obj_{i}", data)
+        collections[i % len(collections)].objects.link(obj)
+        if i % 10 == 0:
+            obj.select_set(True)
+
+
+def bench_scene(quick):
+    context = bpy.context
+    for size in ((10, 1000, 10000) if quick else (10, 1000, 10000, 100000)):
+        populate_scene(size)
+        if hasattr(context.view_layer, 'update'):
+            context.view_layer.update()
+        cold = []
+        for _ in range(3):
+            _snapshots.clear()
+            start = time.perf_counter()
+            get_scene_context(context, 20)
+            cold.append(time.perf_counter() - start)
+        warm = []
+        for _ in range(20):
+            start = time.perf_counter()
+            get_scene_context(context, 20)
+            warm.append(time.perf_counter() - start)
+        record("scene.get_scene_context", "cold", min(cold) * 1000, "ms", "lower", objects=size)
+        record("scene.get_scene_context", "warm", statistics.median(warm) * 1000, "ms", "lower", objects=size)
+
+
+def bench_end_to_end(quick):
+    runs = 3 if quick else 10
+    chunks = split_text(sample_code(4000), 6)
+    with MockChatServer(chunks, chunk_delay=0.001, first_token_delay=0.15,
+                        reasoning=split_text("Let me think. " * 10, 8)) as server:
+        prefs = bench_settings(server.url)
+        ttfts, totals = [], []
+        for run in range(runs):
+            text_block = bpy.data.texts.new(f"bench_e2e_{run}")
+            text_block.from_string("import bpy\n\n# add a cube\n")
+            context = fake_context(text_block, prefs)
+            operator = bind_operator(DEEPSEEK_OT_AutoComplete)
+            original = text_block.as_string()
+            timer = types.SimpleNamespace(type='TIMER')
+
+            start = time.perf_counter()
+            operator.invoke(context, None)
+            first = None
+            # Drive the modal operator the way Blender's timer would
+            while True:
+                time.sleep(operator.scheduler.interval)
+                state = operator.modal(context, timer)
+                if first is None and text_block.as_string() != original:
+                    first = time.perf_counter() - start
+                if state != {'RUNNING_MODAL'}:
+                    break
+            totals.append(time.perf_counter() - start)
+            ttfts.append(first if first is not None else totals[-1])
+            bpy.data.texts.remove(text_block)
+
+    record("e2e.autocomplete", "ttft", statistics.median(ttfts) * 1000, "ms", "lower",
+           first_token_delay_ms=150, chunks=len(chunks))
+    record("e2e.autocomplete", "total", statistics.median(totals) * 1000, "ms", "lower",
+           first_token_delay_ms=150, chunks=len(chunks))
+
+
+def bench_fim_complete(quick):
+    runs = 3 if quick else 10
+    chunks = split_text("mesh.update()\n", 3)
+    before = sample_code(6000) + "for obj in bpy.data.objects:\n    "
+    after = "\n\nprint('done')\n" + sample_code(2000)
+    with MockChatServer(chunks, first_token_delay=0.15) as server:
+        prefs = bench_settings(server.url, fim_url=server.url)
+        totals = []
+        for run in range(runs):
+            text_block = bpy.data.texts.new(f"bench_fim_{run}")
+            text_block.from_string(before + after)
+            line = before.count('\n')
+            text_block.cursor_set(line, character=4)
+            context = fake_context(text_block, prefs)
+            operator = bind_operator(DEEPSEEK_OT_FimComplete)
+            timer = types.SimpleNamespace(type='TIMER')
+
+            start = time.perf_counter()
+            operator.invoke(context, None)
+            while operator.modal(context, timer) == {'RUNNING_MODAL'}:
+                time.sleep(operator.scheduler.interval)
+            totals.append(time.perf_counter() - start)
+            assert text_block.as_string() == before + "mesh.update()\n" + after
+            bpy.data.texts.remove(text_block)
+
+    record("e2e.fim_complete", "total", statistics.median(totals) * 1000, "ms", "lower",
+           first_token_delay_ms=150, chunks=len(chunks))
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "bpy": "stub" if getattr(bpy, "__stub__", False) else bpy.app.version_string,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True), result["metric"]
+
+
+def compare(baseline_path, threshold):
+    """Print how results moved against a baseline file; return the regressions"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(_key(result))
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        worse = change > threshold if result["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(result)
+        print(f"{'REGRESSION' if worse else 'ok':<10} {result['name']:<28} {result['metric']:<8} "
+              f"{json.dumps(result['params'])}: {before['value']:.4f} -> {result['value']:.4f} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    env = environment()
+    print(f"bpy: {env['bpy']}, Python {env['python']}, commit {env['commit']}")
+    for bench in (bench_parse, bench_stream_generation, bench_apply_tick, bench_scene, bench_end_to_end,
+                  bench_fim_complete):
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench(ARGS.quick)
+
+    if ARGS.output:
+        with open(ARGS.output, 'w', encoding='utf-8') as f:
+            json.dump({"environment": env, "results": results}, f, indent=1)
+        print(f"Results written to {ARGS.output}")
+    if ARGS.baseline and compare(ARGS.baseline, ARGS.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Minimal stand-in for the ``bpy`` module, for benchmarks outside Blender.
+
+Covers what the add-on touches at import time plus working Text blocks
+and synthetic scenes. Text edits follow Blender's semantics
+(``select_set`` + ``write`` replaces the selection, ``cursor_set``
+collapses it), but nothing here is meant to match Blender's speed:
+compare numbers only against runs using the same backend.
+
+    import bpy_stub
+    bpy = bpy_stub.install()    # returns the real bpy when it is available
+"""
+import itertools
+import sys
+import tempfile
+import types
+
+_uids = itertools.count(1)
+
+
+class _Deferred:
+    """What bpy.props functions return: the function and its keywords"""
+
+    def __init__(self, function, keywords):
+        self.function = function
+        self.keywords = keywords
+
+
+def _prop(name):
+    def function(**keywords):
+        return _Deferred(function, keywords)
+    function.__name__ = name
+    return function
+
+
+class Line:
+    __slots__ = ("body",)
+
+    def __init__(self, body):
+        self.body = body
+
+
+class _Lines:
+    """Read view of a Text's lines, like the bpy_prop_collection"""
+
+    def __init__(self, text):
+        self._text = text
+
+    def __len__(self):
+        return len(self._text._lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Line(body) for body in self._text._lines[index]]
+        return Line(self._text._lines[index])
+
+    def __iter__(self):
+        return (Line(body) for body in self._text._lines)
+
+
+class Text:
+
+    def __init__(self, name):
+        self.name = self.name_full = name
+        self._lines = [""]
+        self.current_line_index = 0
+        self.current_character = 0
+        self.select_end_line_index = 0
+        self.select_end_character = 0
+
+    @property
+    def lines(self):
+        return _Lines(self)
+
+    def as_string(self):
+        return '\n'.join(self._lines)
+
+    def from_string(self, string):
+        self._lines = string.split('\n')
+        self.cursor_set(len(self._lines) - 1, character=len(self._lines[-1]))
+
+    def clear(self):
+        self.from_string("")
+
+    def _clamp(self, line, character):
+        line = max(0, min(line, len(self._lines) - 1))
+        return line, max(0, min(character, len(self._lines[line])))
+
+    def cursor_set(self, line, character=0):
+        line, character = self._clamp(line, character)
+        self.current_line_index = self.select_end_line_index = line
+        self.current_character = self.select_end_character = character
+
+    def select_set(self, line_start, char_start, line_end, char_end):
+        self.current_line_index, self.current_character = self._clamp(line_start, char_start)
+        self.select_end_line_index, self.select_end_character = self._clamp(line_end, char_end)
+
+    def write(self, text):
+        start = (self.current_line_index, self.current_character)
+        end = (self.select_end_line_index, self.select_end_character)
+        (l1, c1), (l2, c2) = sorted((start, end))
+        head = self._lines[l1][:c1]
+        tail = self._lines[l2][c2:]
+        new = (head + text + tail).split('\n')
+        self._lines[l1:l2 + 1] = new
+        # Like Blender, the cursor ends up at the end of the text, not after the written text
+        last = len(self._lines) - 1
+        self.cursor_set(last, len(self._lines[last]))
+
+
+class _DataCollection(list):
+
+    def __init__(self, factory=None):
+        super().__init__()
+        self._factory = factory
+
+    def new(self, name, *args):
+        item = self._factory(name, *args)
+        self.append(item)
+        return item
+
+    def get(self, name, default=None):
+        return next((item for item in self if item.name == name), default)
+
+    def link(self, item):
+        self.append(item)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        return super().__getitem__(key)
+
+    def foreach_get(self, attribute, sequence):
+        for i, item in enumerate(self):
+            value = getattr(item, attribute)
+            sequence[i] = OBJECT_TYPES.index(value) if attribute == 'type' else value
+
+
+OBJECT_TYPES = ['MESH', 'CURVE', 'SURFACE', 'META', 'FONT', 'CURVES', 'POINTCLOUD', 'VOLUME',
+                'GREASEPENCIL', 'ARMATURE', 'LATTICE', 'EMPTY', 'LIGHT', 'LIGHT_PROBE', 'CAMERA', 'SPEAKER']
+
+
+class ID:
+
+    def __init__(self, name):
+        self.name = self.name_full = name
+        self.session_uid = next(_uids)
+
+    @property
+    def original(self):
+        return self
+
+
+class Camera(ID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.type = 'PERSP'
+        self.lens = 50.0
+        self.clip_start = 0.1
+        self.clip_end = 1000.0
+
+
+class Light(ID):
+
+    def __init__(self, name, type='POINT'):
+        super().__init__(name)
+        self.type = type
+        self.energy = 1000.0
+        self.color = (1.0, 1.0, 1.0)
+
+
+class Mesh(ID):
+    pass
+
+
+class Object(ID):
+
+    def __init__(self, name, data=None):
+        super().__init__(name)
+        self.data = data
+        if isinstance(data, Camera):
+            self.type = 'CAMERA'
+        elif isinstance(data, Light):
+            self.type = 'LIGHT'
+        elif data is None:
+            self.type = 'EMPTY'
+        else:
+            self.type = 'MESH'
+        self._selected = False
+
+    def select_get(self):
+        return self._selected
+
+    def select_set(self, state):
+        self._selected = state
+
+
+class _EnumItem:
+
+    def __init__(self, value, identifier):
+        self.value = value
+        self.identifier = identifier
+
+
+Object.bl_rna = types.SimpleNamespace(properties={'type': types.SimpleNamespace(
+    enum_items=[_EnumItem(value, identifier) for value, identifier in enumerate(OBJECT_TYPES)])})
+
+
+class Collection(ID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = _DataCollection()
+        self.children = _DataCollection()
+
+    @property
+    def children_recursive(self):
+        found = []
+        for child in self.children:
+            found.append(child)
+            found.extend(child.children_recursive)
+        return found
+
+
+class Scene(ID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.collection = Collection("Scene Collection")
+        self.render = types.SimpleNamespace(engine='BLENDER_EEVEE_NEXT')
+
+    @property
+    def objects(self):
+        found = _DataCollection()
+        found.extend(self.collection.objects)
+        for child in self.collection.children_recursive:
+            found.extend(child.objects)
+        return found
+
+
+class _ViewLayerObjects:
+
+    def __init__(self, scene):
+        self._scene = scene
+        self.active = None
+
+    @property
+    def selected(self):
+        return [obj for obj in self._scene.objects if obj.select_get()]
+
+
+class Operator:
+
+    def report(self, level, message):
+        pass
+
+
+class _Types(types.ModuleType):
+    """bpy.types: known stand-ins, and an empty class for any other name"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        cls = type(name, (), {})
+        setattr(self, name, cls)
+        return cls
+
+
+class _Menu:
+
+    @staticmethod
+    def append(func):
+        pass
+
+    @staticmethod
+    def remove(func):
+        pass
+
+
+def persistent(func):
+    return func
+
+
+def _user_resource(kind, path=""):
+    return tempfile.gettempdir() + "/bpy_stub/" + path
+
+
+def _extension_path_user(package, path="", create=False):
+    raise ValueError("Not an extension")
+
+
+def build():
+    bpy = types.ModuleType("bpy")
+    bpy.__stub__ = True
+
+    bpy_types = _Types("bpy.types")
+    for cls in (Operator, Text, Object, Camera, Light, Mesh, Collection, Scene, ID):
+        setattr(bpy_types, cls.__name__, cls)
+    bpy_types.AddonPreferences = type("AddonPreferences", (), {})
+    bpy_types.TEXT_MT_editor_menus = _Menu
+    bpy.types = bpy_types
+
+    props = types.ModuleType("bpy.props")
+    for name in ("BoolProperty", "IntProperty", "FloatProperty", "StringProperty", "EnumProperty",
+                 "FloatVectorProperty", "IntVectorProperty", "PointerProperty", "CollectionProperty"):
+        setattr(props, name, _prop(name))
+    bpy.props = props
+
+    handlers = types.SimpleNamespace(depsgraph_update_post=[], load_post=[], persistent=persistent)
+    timers = types.SimpleNamespace(register=lambda func, first_interval=0, persistent=False: None,
+                                   unregister=lambda func: None, is_registered=lambda func: False)
+    bpy.app = types.SimpleNamespace(version=(0, 0, 0), version_string="bpy stub",
+                                    handlers=handlers, timers=timers, background=True)
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None,
+                                      user_resource=_user_resource, extension_path_user=_extension_path_user)
+    bpy.ops = types.SimpleNamespace()
+
+    scene = Scene("Scene")
+    view_layer = types.SimpleNamespace(objects=_ViewLayerObjects(scene), update=lambda: None)
+    bpy.data = types.SimpleNamespace(
+        texts=_DataCollection(Text),
+        objects=_DataCollection(Object),
+        meshes=_DataCollection(Mesh),
+        lights=_DataCollection(Light),
+        cameras=_DataCollection(Camera),
+        collections=_DataCollection(Collection),
+        scenes=_DataCollection(Scene),
+    )
+    bpy.data.scenes.append(scene)
+    bpy.context = types.SimpleNamespace(
+        scene=scene, view_layer=view_layer,
+        preferences=types.SimpleNamespace(addons={}),
+    )
+    return bpy
+
+
+def install(force=False):
+    """Return the real bpy if it can be imported (and not force), else register and return the stub"""
+    if not force:
+        try:
+            import bpy
+            return bpy
+        except ImportError:
+            pass
+    bpy = build()
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = bpy.types
+    sys.modules["bpy.props"] = bpy.props
+    app = types.ModuleType("bpy.app")
+    app.__dict__.update(vars(bpy.app))
+    bpy.app = app
+    sys.modules["bpy.app"] = app
+    handlers = types.ModuleType("bpy.app.handlers")
+    handlers.__dict__.update(vars(app.handlers))
+    app.handlers = handlers
+    sys.modules["bpy.app.handlers"] = handlers
+    return bpy
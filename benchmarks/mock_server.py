@@ -0,0 +1,167 @@
+"""Local mock of an OpenAI/DeepSeek chat-completions endpoint.
+
+Streams SSE over HTTP/1.1 keep-alive with chunked transfer encoding.
+``connect_delay`` is paid once per new TCP connection and stands in for
+the TCP+TLS handshake to a remote provider; ``first_token_delay`` is the
+time the model "thinks" before the first chunk. ``reasoning`` chunks are
+sent as ``reasoning_content`` deltas before the content, ``statuses``
+lists the HTTP status of the first requests (later ones get 200) and
+``fail_after`` drops the connection after that many content chunks.
+``quota`` = (requests, seconds) answers 429 with a Retry-After to requests
+beyond that many in any window of that length, like a shared API quota.
+Requests with a ``prompt`` (text completions, as for fill-in-the-middle)
+get ``text`` chunks instead of chat deltas.
+"""
+import json
+import socket
+import threading
+import math
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def split_text(text, size):
+    """Split text into chunks of size characters, like a provider's token deltas"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        retry_after = server.retry_after
+        with server.lock:
+            server.requests.append(payload)
+            status = server.statuses.pop(0) if server.statuses else 200
+            if status == 200 and server.quota:
+                limit, window = server.quota
+                now = time.monotonic()
+                while server.admitted and server.admitted[0] <= now - window:
+                    server.admitted.popleft()
+                if len(server.admitted) >= limit:
+                    status = 429
+                    retry_after = math.ceil(server.admitted[0] + window - now)
+                else:
+                    server.admitted.append(now)
+            if status == 429:
+                server.throttled += 1
+
+        if status != 200:
+            body = json.dumps({"error": {"message": f"Mock error {status}", "code": status}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if retry_after is not None:
+                self.send_header("Retry-After", str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if not payload.get("stream"):
+            body = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": ''.join(server.chunks)}}]
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(server.first_token_delay)
+        deltas = [("reasoning_content", chunk) for chunk in server.reasoning]
+        deltas += [("content", chunk) for chunk in server.chunks]
+        sent = 0
+        for key, chunk in deltas:
+            if server.fail_after is not None and key == "content" and sent == server.fail_after:
+                # Drop the connection mid-stream, without [DONE]
+                self.close_connection = True
+                return
+            time.sleep(server.chunk_delay)
+            if "prompt" in payload:
+                # Text completions (fill-in-the-middle) carry plain text
+                event = {"choices": [{"index": 0, "text": chunk}]}
+            else:
+                event = {"choices": [{"index": 0, "delta": {key: chunk}}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            sent += key == "content"
+        if payload.get("stream_options", {}).get("include_usage"):
+            completion = sum(len(chunk) for _, chunk in deltas) // 4
+            usage = {"prompt_tokens": server.prompt_tokens, "completion_tokens": completion,
+                     "total_tokens": server.prompt_tokens + completion}
+            self._write_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of concurrent requests must not overflow the listen backlog
+    request_queue_size = 128
+
+    def __init__(self, chunks=None, chunk_delay=0.0, connect_delay=0.0, port=0, reasoning=(),
+                 first_token_delay=0.0, statuses=(), retry_after=None, fail_after=None, prompt_tokens=1000, quota=None):
+        super().__init__(("127.0.0.1", port), MockChatHandler)
+        self.chunks = chunks if chunks is not None else ["import bpy\n", "x = 1\n"]
+        self.chunk_delay = chunk_delay
+        self.connect_delay = connect_delay
+        self.reasoning = list(reasoning)
+        self.first_token_delay = first_token_delay
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.fail_after = fail_after
+        self.prompt_tokens = prompt_tokens
+        self.quota = quota
+        self.admitted = deque()
+        self.throttled = 0
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is expected, not an error
+        pass
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/chat/completions"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    with MockChatServer(port=8765) as server:
+        print(f"Serving mock chat completions on {server.url}")
+        threading.Event().wait()
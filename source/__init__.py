@@ -1,7 +1,11 @@
 import bpy
 from .properties import DeepSeekProperties
+from . import api_index, client, hedging, jobs, patching, prefetch, project_index, ratelimit, response_cache, scene_context, sessions, usage, workers
 from .operators.autocomplete import DEEPSEEK_OT_AutoComplete
 from .operators.fix_errors import DEEPSEEK_OT_FixErrors
+from .operators.fim_complete import DEEPSEEK_OT_FimComplete
+from .operators.clear_session import DEEPSEEK_OT_ClearSession
+from .panels import DEEPSEEK_PT_Metrics
 
 class DeepSeekPreferences(bpy.types.AddonPreferences, DeepSeekProperties):
     bl_idname = __name__
@@ -13,10 +17,25 @@ class DeepSeekPreferences(bpy.types.AddonPreferences, DeepSeekProperties):
         layout.prop(self, "api_url")
         layout.prop(self, "model_name")
         layout.prop(self, "model_name_fix_errors")
+        layout.prop(self, "fim_url")
+        
+        layout.separator()
+        layout.label(text="Connection:")
+        layout.prop(self, "connect_timeout")
+        layout.prop(self, "read_timeout")
+        layout.prop(self, "pool_size")
+        layout.prop(self, "rate_limit_rpm")
+        layout.prop(self, "rate_limit_tpm")
+        layout.prop(self, "max_retries")
+        stats = ratelimit.stats
+        if stats["requests"]:
+            layout.label(text=f"Rate limits: {stats['retries']} retries, {stats['waited']:.1f}s waited, "
+                              f"{stats['rejected']} rejected while the API was down ({stats['requests']} requests)")
         
         layout.separator()
         layout.label(text="Generation Parameters:")
         layout.prop(self, "max_tokens")
+        layout.prop(self, "fim_max_tokens")
         layout.prop(self, "temperature")
         layout.prop(self, "top_p")
         layout.prop(self, "frequency_penalty")
@@ -24,23 +43,97 @@ class DeepSeekPreferences(bpy.types.AddonPreferences, DeepSeekProperties):
         
         layout.separator()
         layout.label(text="Prompt Configuration:")
+        layout.prop(self, "max_context_tokens")
+        layout.prop(self, "api_context_tokens")
+        layout.prop(self, "project_context_tokens")
+        if self.project_context_tokens:
+            layout.prop(self, "project_module_paths")
+            sources, definitions = project_index.counts()
+            layout.label(text=f"Project index: {definitions} definitions in {sources} Text blocks and files")
+        layout.prop(self, "session_tokens")
+        if self.session_tokens:
+            stats = sessions.stats
+            layout.label(text=f"Sessions: {sessions.count()} Text blocks, {stats['turns']} turns, "
+                              f"{stats['compactions']} compactions")
+        layout.prop(self, "scene_max_listed")
+        layout.prop(self, "system_prompt")
         layout.prop(self, "custom_prompt")
         
         layout.separator()
         layout.label(text="Error Correction Prompt:")
+        layout.prop(self, "fix_mode")
+        layout.prop(self, "fix_execute")
+        if self.fix_execute:
+            layout.prop(self, "fix_execute_budget")
         layout.prop(self, "error_prompt")
+        layout.prop(self, "error_diff_prompt")
+        stats = patching.stats
+        if stats["applied"] or stats["fallback"]:
+            layout.label(text=f"Patches: {stats['applied']} applied, {stats['fallback']} fell back "
+                              f"({patching.applied_rate():.0%} applied)")
+
+        layout.separator()
+        layout.label(text="Performance:")
+        layout.prop(self, "frame_budget_ms")
+        layout.prop(self, "max_concurrent_jobs")
+        layout.prop(self, "debounce_ms")
+        layout.prop(self, "response_cache")
+        if self.response_cache != 'OFF':
+            layout.prop(self, "response_cache_size_mb")
+            layout.prop(self, "response_cache_max_age_days")
+            stats = response_cache.stats
+            layout.label(text=f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+        if usage.stats["requests"]:
+            layout.label(text=f"Provider prompt cache: {usage.hit_rate():.0%} of "
+                              f"{usage.stats['prompt_tokens']} prompt tokens hit "
+                              f"({usage.stats['requests']} requests)")
+        layout.prop(self, "hedge_mode")
+        if self.hedge_mode != 'OFF':
+            if self.hedge_mode == 'CANDIDATES':
+                layout.prop(self, "hedge_candidates")
+            else:
+                layout.prop(self, "hedge_delay")
+            layout.prop(self, "hedge_token_budget")
+            stats = hedging.stats
+            layout.label(text=f"Hedging: {stats['won']}/{stats['hedged']} extra requests won, "
+                              f"{stats['saved']:.1f}s saved, {stats['extra_tokens']} extra tokens")
+        layout.prop(self, "prefetch")
+        if self.prefetch:
+            layout.prop(self, "prefetch_idle_ms")
+            layout.prop(self, "prefetch_token_budget")
+            stats = prefetch.stats
+            layout.label(text=f"Prefetch: {stats['used']}/{stats['started']} used, {stats['cancelled']} cancelled, "
+                              f"{stats['spent']}/{self.prefetch_token_budget} tokens spent")
+        layout.prop(self, "trace_log_path")
 
 def menu_draw(self, context):
     self.layout.operator(DEEPSEEK_OT_AutoComplete.bl_idname)
+    self.layout.operator(DEEPSEEK_OT_FimComplete.bl_idname)
     self.layout.operator(DEEPSEEK_OT_FixErrors.bl_idname)
+    self.layout.operator(DEEPSEEK_OT_ClearSession.bl_idname)
 
 addon_keymaps = []
 
+def warm_up_connection():
+    addon = bpy.context.preferences.addons.get(__name__)
+    if addon is None:
+        return
+    prefs = addon.preferences
+    client.warm_up(prefs.api_url, prefs.pool_size, prefs.connect_timeout)
+
 def register():
     bpy.utils.register_class(DeepSeekPreferences)
     bpy.utils.register_class(DEEPSEEK_OT_AutoComplete)
     bpy.utils.register_class(DEEPSEEK_OT_FixErrors)
+    bpy.utils.register_class(DEEPSEEK_OT_FimComplete)
+    bpy.utils.register_class(DEEPSEEK_OT_ClearSession)
+    bpy.utils.register_class(DEEPSEEK_PT_Metrics)
     bpy.types.TEXT_MT_editor_menus.append(menu_draw)
+    scene_context.register()
+    workers.start()
+    prefetch.register()
+    project_index.register()
+    api_index.register()
 
     # CTRL + SPACE to trigger autocomplete
     wm = bpy.context.window_manager
@@ -56,6 +149,16 @@ def register():
         )
         addon_keymaps.append((km, kmi))
 
+        # CTRL + SHIFT + SPACE for a short completion at the cursor
+        kmi = km.keymap_items.new(
+            DEEPSEEK_OT_FimComplete.bl_idname,
+            'SPACE',
+            'PRESS',
+            ctrl=True,
+            shift=True
+        )
+        addon_keymaps.append((km, kmi))
+
     # F8 to trigger error correction
     km = kc.keymaps.new(name='Text', space_type='TEXT_EDITOR')
     kmi = km.keymap_items.new(
@@ -66,7 +169,19 @@ def register():
         shift=False
     )
 
+    # Open the API connection now so the first request skips the handshake
+    warm_up_connection()
+
 def unregister():
+    jobs.cancel_all()
+    prefetch.unregister()
+    project_index.unregister()
+    sessions.clear()
+    workers.stop()
+    client.close_all()
+    api_index.unregister()
+    scene_context.unregister()
+
     for km, kmi in addon_keymaps:
         km.keymap_items.remove(kmi)
     addon_keymaps.clear()
@@ -74,4 +189,7 @@ def unregister():
     bpy.utils.unregister_class(DeepSeekPreferences)
     bpy.utils.unregister_class(DEEPSEEK_OT_AutoComplete)
     bpy.utils.unregister_class(DEEPSEEK_OT_FixErrors)
+    bpy.utils.unregister_class(DEEPSEEK_OT_FimComplete)
+    bpy.utils.unregister_class(DEEPSEEK_OT_ClearSession)
+    bpy.utils.unregister_class(DEEPSEEK_PT_Metrics)
     bpy.types.TEXT_MT_editor_menus.remove(menu_draw)
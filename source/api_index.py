@@ -0,0 +1,315 @@
+import builtins
+import difflib
+import keyword
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+import bpy
+
+from . import storage, workers
+from .config import API_INDEX_INTERVAL, CHARS_PER_TOKEN
+
+_INDEX_DIR = "api_index"
+_MAGIC = b"BDSAPI1\0"
+# Magic, key count, start of the key blob, start of the entries blob
+_HEADER = struct.Struct("<8sIII")
+# Per key: key offset, key length, entries offset, entries length
+_RECORD = struct.Struct("<IHII")
+
+_DESCRIPTION_CHARS = 80
+_ENUM_ITEMS = 8
+# Members defined on more structs than this are only kept for the first ones
+_MAX_OWNERS = 4
+
+_CHAIN_RE = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
+_IGNORED = set(keyword.kwlist) | set(dir(builtins)) | {
+    'bpy', 'ops', 'types', 'data', 'context', 'self', 'cls', 'props', 'utils'}
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _describe(text):
+    text = ' '.join(text.split())
+    if len(text) > _DESCRIPTION_CHARS:
+        text = text[:_DESCRIPTION_CHARS - 3] + "..."
+    return f" - {text}" if text else ""
+
+
+def _property_type(prop):
+    if prop.type == 'POINTER':
+        return prop.fixed_type.identifier
+    if prop.type == 'COLLECTION':
+        return f"collection of {prop.fixed_type.identifier}"
+    if prop.type == 'ENUM':
+        items = [item.identifier for item in prop.enum_items]
+        shown = ', '.join(f"'{item}'" for item in items[:_ENUM_ITEMS])
+        more = ", ..." if len(items) > _ENUM_ITEMS else ""
+        kind = "enum set" if prop.is_enum_flag else "enum"
+        return f"{kind} in [{shown}{more}]"
+    kind = prop.type.lower()
+    if getattr(prop, 'array_length', 0):
+        # Vectors and colors; scalar subtypes are often unit flags RNA cannot name
+        kind += f"[{prop.array_length}]"
+        if prop.subtype not in ('NONE', ''):
+            kind += f" ({prop.subtype})"
+    return kind
+
+
+def _default(prop):
+    if prop.type == 'ENUM':
+        if not len(prop.enum_items):
+            # Items generated at runtime, the default cannot be named here
+            return "''"
+        return repr(set(prop.default_flag)) if prop.is_enum_flag else repr(prop.default)
+    if getattr(prop, 'array_length', 0):
+        return repr(tuple(round(v, 4) if isinstance(v, float) else v for v in prop.default_array))
+    if prop.type in ('POINTER', 'COLLECTION'):
+        return "None"
+    value = prop.default
+    return repr(round(value, 4) if isinstance(value, float) else value)
+
+
+def _function_signature(owner, func):
+    params = []
+    outputs = []
+    for param in func.parameters:
+        if param.is_output:
+            outputs.append(_property_type(param))
+        elif param.is_required:
+            params.append(param.identifier)
+        else:
+            params.append(f"{param.identifier}={_default(param)}")
+    returns = f" -> {', '.join(outputs)}" if outputs else ""
+    return f"{owner}.{func.identifier}({', '.join(params)}){returns}{_describe(func.description)}"
+
+
+def _collect():
+    """Map of lookup key to signature lines, walked from the live RNA"""
+    entries = {}
+    owners = {}
+
+    def add(key, line):
+        entries.setdefault(key, []).append(line)
+
+    for name in dir(bpy.types):
+        rna = getattr(getattr(bpy.types, name), 'bl_rna', None)
+        if rna is None or rna.identifier != name:
+            continue
+        base = f"({rna.base.identifier})" if rna.base else ""
+        add(name, f"class bpy.types.{name}{base}{_describe(rna.description)}")
+        inherited = rna.base.properties if rna.base else ()
+        inherited_functions = rna.base.functions if rna.base else ()
+        for prop in rna.properties:
+            if prop.identifier == 'rna_type' or prop.identifier in inherited:
+                continue
+            readonly = " (readonly)" if prop.is_readonly else ""
+            line = f"{name}.{prop.identifier}: {_property_type(prop)}{readonly}{_describe(prop.description)}"
+            add(f"{name}.{prop.identifier}", line)
+            owners.setdefault(prop.identifier, []).append((-len(rna.properties), line))
+        for func in rna.functions:
+            if func.identifier in inherited_functions:
+                continue
+            line = _function_signature(name, func)
+            add(f"{name}.{func.identifier}", line)
+            owners.setdefault(func.identifier, []).append((-len(rna.properties), line))
+
+    for module_name in dir(bpy.ops):
+        module = getattr(bpy.ops, module_name)
+        for op_name in dir(module):
+            try:
+                rna = getattr(module, op_name).get_rna_type()
+            except KeyError:
+                continue
+            params = [f"{prop.identifier}={_default(prop)}"
+                      for prop in rna.properties if prop.identifier != 'rna_type']
+            line = f"bpy.ops.{module_name}.{op_name}({', '.join(params)}){_describe(rna.description)}"
+            add(f"{module_name}.{op_name}", line)
+
+    # Bare member names, preferring the central structs with the most properties
+    for member, found in owners.items():
+        found.sort(key=lambda item: item[0])
+        for _, line in found[:_MAX_OWNERS]:
+            add(member, line)
+    return entries
+
+
+def build_index(path):
+    """Write the API index of the running Blender to path"""
+    entries = _collect()
+    keys = sorted(key.encode('utf-8') for key in entries)
+    key_blob = bytearray()
+    data_blob = bytearray()
+    table = bytearray()
+    for key in keys:
+        data = '\n'.join(entries[key.decode('utf-8')]).encode('utf-8')
+        table += _RECORD.pack(len(key_blob), len(key), len(data_blob), len(data))
+        key_blob += key
+        data_blob += data
+
+    keys_start = _HEADER.size + len(table)
+    data_start = keys_start + len(key_blob)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(keys), keys_start, data_start))
+        f.write(table)
+        f.write(key_blob)
+        f.write(data_blob)
+    os.replace(tmp, path)
+
+
+class ApiIndex:
+    """Read-only view of an index file, memory-mapped and binary searched"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._keys, self._data = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError("Not an API index file")
+        self._table = _HEADER.size
+
+    def close(self):
+        self._map.close()
+
+    def _key(self, i):
+        key_offset, key_length, _, _ = _RECORD.unpack_from(self._map, self._table + i * _RECORD.size)
+        start = self._keys + key_offset
+        return self._map[start:start + key_length]
+
+    def _search(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, key):
+        """Signature lines for key, or an empty list"""
+        key = key.encode('utf-8')
+        i = self._search(key)
+        if i >= self.count or self._key(i) != key:
+            return []
+        _, _, data_offset, data_length = _RECORD.unpack_from(self._map, self._table + i * _RECORD.size)
+        start = self._data + data_offset
+        return self._map[start:start + data_length].decode('utf-8').split('\n')
+
+    def similar(self, name, limit=2):
+        """Keys close to a misspelled name, searched among keys sharing its first letters"""
+        prefix = name[:3].encode('utf-8')
+        i = self._search(prefix)
+        candidates = []
+        while i < self.count and len(candidates) < 5000:
+            key = self._key(i)
+            if not key.startswith(prefix):
+                break
+            candidates.append(key.decode('utf-8'))
+            i += 1
+        return difflib.get_close_matches(name, candidates, n=limit, cutoff=0.8)
+
+
+def _index_path():
+    version = '_'.join(str(part) for part in bpy.app.version)
+    return os.path.join(storage.user_directory(_INDEX_DIR), f"bpy_api_{version}.idx")
+
+
+def get_index():
+    """The index for this Blender version, built the first time it is needed; blocks"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = _index_path()
+            if not os.path.exists(path):
+                start = time.perf_counter()
+                build_index(path)
+                print(f"[DeepSeek] Built the bpy API index in {time.perf_counter() - start:.2f}s: {path}")
+            try:
+                _index = ApiIndex(path)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"[DeepSeek] Could not read the bpy API index: {e}")
+                return None
+        return _index
+
+
+def ready_index():
+    """The index if it is loaded, without ever building or reading it"""
+    return _index
+
+
+def _load():
+    """Timer: once the index is wanted, load (or build) it on the worker pool"""
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon is None or addon.preferences.api_context_tokens == 0:
+        return API_INDEX_INTERVAL
+    # Building walks the whole RNA, which would freeze the UI on the main thread
+    workers.submit(get_index)
+    return None
+
+
+def register():
+    bpy.app.timers.register(_load, first_interval=API_INDEX_INTERVAL, persistent=True)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(_load):
+        bpy.app.timers.unregister(_load)
+    close()
+
+
+def close():
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
+
+
+def api_context(text, max_tokens, fuzzy=False):
+    """Signatures of the bpy API the identifiers in text refer to, within max_tokens.
+
+    Dotted names near the end of text are looked up first, as pairs
+    (``mesh.primitive_cube_add``, ``Object.location``) and then as bare
+    member names. With ``fuzzy``, unknown operators and names are matched
+    to the closest known ones, which helps with misspelled APIs from
+    tracebacks. Until the index is loaded (in the background after
+    register, or by get_index() in scripts) there is no API context.
+    """
+    if max_tokens <= 0:
+        return ""
+    index = ready_index()
+    if index is None:
+        return ""
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    used = 0
+    lines = []
+    seen = set()
+    for chain in reversed(_CHAIN_RE.findall(text)):
+        parts = chain.split('.')
+        is_operator = parts[:2] == ['bpy', 'ops']
+        pairs = [f"{a}.{b}" for a, b in zip(parts, parts[1:]) if a not in _IGNORED and b not in _IGNORED]
+        names = [part for part in parts if part not in _IGNORED and len(part) >= 3]
+        for key in pairs[::-1] + names[::-1]:
+            if key in seen:
+                continue
+            seen.add(key)
+            found = index.get(key)
+            if not found and fuzzy and (is_operator or '.' not in key):
+                for similar in index.similar(key):
+                    found.extend(index.get(similar))
+            for line in found:
+                if line in lines:
+                    continue
+                if used + len(line) + 1 > budget:
+                    return '\n'.join(lines)
+                lines.append(line)
+                used += len(line) + 1
+    return '\n'.join(lines)
@@ -0,0 +1,389 @@
+"""Headless Fix Errors / Autocomplete over many scripts.
+
+Run from Blender without a UI, for example:
+
+    blender --background --python <add-on folder>/batch.py -- \\
+        --mode fix --input scripts/ --output fixed/ --report report.jsonl
+
+Text datablocks of the opened .blend file can be processed with
+``--texts`` (add ``--save`` to keep the changes), and ``run_batch()`` can
+be called directly from a script. Requests go through a bounded thread
+worker loop, at most ``workers`` at a time; the Text blocks are only
+touched on the main thread.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+if __name__ == "__main__" and not __package__:
+    # Started with --python: import the add-on package so relative imports work
+    import importlib
+    _root = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_root))
+    __package__ = os.path.basename(_root)
+    importlib.import_module(__package__)
+
+import bpy
+import requests
+
+from . import api_index, client, patching, preflight, project_index, prompts, ratelimit, response_cache, scene_context, tracing, usage, workers
+from .code_context import AFTER_CURSOR_MARKER, build_code_context
+from .config import WORKER_THREADS
+from .properties import DeepSeekProperties
+from .streaming import TextStreamWriter, iter_stream_events
+
+
+def batch_settings(prefs=None, **overrides):
+    """Plain copy of the add-on preferences (or their defaults) with overrides applied.
+
+    The copy can be changed freely and read from worker threads.
+    """
+    values = {}
+    for name, prop in DeepSeekProperties.__annotations__.items():
+        values[name] = getattr(prefs, name) if prefs is not None else prop.keywords.get('default')
+    values.update(overrides)
+    return types.SimpleNamespace(**values)
+
+
+def find_preferences():
+    """Preferences of the enabled add-on, or None when it is not enabled"""
+    name = __package__.rsplit('.', 1)[-1]
+    for key, addon in bpy.context.preferences.addons.items():
+        if key.rsplit('.', 1)[-1] == name:
+            return addon.preferences
+    return None
+
+
+class Response:
+    """Outcome of one request, collected by a worker thread"""
+
+    def __init__(self, events=(), cached=False):
+        self.events = list(events)
+        self.usage = None
+        self.error = None
+        self.ttft = None
+        self.seconds = 0.0
+        self.cached = cached
+
+    @property
+    def content(self):
+        return ''.join(data for kind, data in self.events if kind == 'content')
+
+
+def fetch(prefs, payload, recorder, trace):
+    """Stream one request to completion; safe to run off the main thread"""
+    result = Response()
+    start = time.perf_counter()
+    try:
+        response = client.open_stream(prefs, payload, trace)
+        if response.status_code != 200:
+            result.error = f"HTTP Error {response.status_code}"
+        else:
+            for event in iter_stream_events(response, trace):
+                kind, data = event
+                trace.observe(event)
+                recorder.record(event)
+                if kind in ('reasoning', 'content'):
+                    if result.ttft is None:
+                        result.ttft = time.perf_counter() - start
+                    result.events.append(event)
+                elif kind == 'usage':
+                    result.usage = data
+                    ratelimit.spend(prefs, data)
+                elif kind == 'error':
+                    result.error = data
+                    break
+    except (requests.exceptions.RequestException, ValueError) as e:
+        result.error = f"Connection error: {str(e)}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+class BatchItem:
+    """One script: a Text block, loaded from ``path`` unless it came from the .blend"""
+
+    def __init__(self, text, path=None, output=None):
+        self.text = text
+        self.path = path
+        self.output = output
+        self.original = text.as_string()
+        self.error_data = None
+        self.fix_mode = None
+        # Response cache and key of the last request
+        self.cache = None
+        self.cache_key = None
+        self.report = {"source": path or f"Text:{text.name}"}
+
+
+class BatchRunner:
+    """Prepares requests on the main thread, runs them on the worker loop and applies the results"""
+
+    def __init__(self, prefs, mode, workers, report_file=None, execute=False):
+        self.prefs = prefs
+        self.mode = mode
+        self.workers = workers
+        self.report_file = report_file
+        self.execute = execute
+        self.pending = {}
+        self.reports = []
+
+    def run(self, items):
+        items = iter(items)
+        try:
+            while True:
+                # Keep up to `workers` requests in flight; clean scripts finish right away
+                while len(self.pending) < self.workers:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    self._prepare(item)
+                if not self.pending:
+                    break
+                done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._apply(self.pending.pop(future), future.result())
+        finally:
+            for future in self.pending:
+                future.cancel()
+        return self.reports
+
+    def _prepare(self, item):
+        item.report["mode"] = self.mode
+        item.trace = tracing.Trace(f"BATCH_{self.mode}")
+        item.started = item.trace.started
+        if self.mode == 'FIX':
+            with item.trace.span('checks'):
+                item.error_data, note = preflight.find_errors(
+                    item.original, item.text.name, self.execute, self.prefs.fix_execute_budget)
+            if note:
+                item.report["note"] = note
+            if item.error_data is None:
+                self._finish(item, "clean")
+                return
+            item.report["problem"] = item.error_data["message"]
+            item.fix_mode = self.prefs.fix_mode
+            with item.trace.span('context'):
+                payload = prompts.fix_payload(self.prefs, item.error_data, item.fix_mode, item.text)
+            self._submit(item, payload)
+        else:
+            text = item.text
+            # Complete at the end of the script
+            text.cursor_set(len(text.lines) - 1, character=len(text.lines[-1].body))
+            with item.trace.span('scene'):
+                scene = scene_context.get_scene_context(bpy.context, self.prefs.scene_max_listed)
+            with item.trace.span('context'):
+                code_context = build_code_context(text, self.prefs.max_context_tokens)
+                before_cursor = code_context.split(AFTER_CURSOR_MARKER)[0]
+                api_context = api_index.api_context(before_cursor, self.prefs.api_context_tokens)
+                project_context = project_index.project_context(before_cursor, self.prefs.project_context_tokens,
+                                                                text)
+                messages = prompts.build_messages(self.prefs, code_context, scene, api_context, project_context)
+                payload = prompts.autocomplete_payload(self.prefs, messages)
+            self._submit(item, payload)
+
+    def _submit(self, item, payload):
+        cache = response_cache.get_cache(self.prefs, payload)
+        cache_key = response_cache.request_key(payload) if cache else None
+        item.cache, item.cache_key = cache, cache_key
+        cached = response_cache.lookup(cache, cache_key) if cache else None
+        if cached is not None:
+            future = Future()
+            future.set_result(Response(cached, cached=True))
+            item.trace.cached = True
+        else:
+            recorder = response_cache.CacheRecorder(cache, cache_key)
+            future = workers.submit(fetch, self.prefs, payload, recorder, item.trace)
+        self.pending[future] = item
+
+    def _apply(self, item, result):
+        item.report["ttft"] = result.ttft
+        item.report["cached_response"] = result.cached
+        if result.usage:
+            prompt_tokens, completion_tokens, hit, _ = usage.record(result.usage)
+            item.report["prompt_tokens"] = item.report.get("prompt_tokens", 0) + prompt_tokens
+            item.report["completion_tokens"] = item.report.get("completion_tokens", 0) + completion_tokens
+            item.report["cached_tokens"] = item.report.get("cached_tokens", 0) + hit
+        if result.error:
+            item.report["error"] = result.error
+            self._finish(item, "error")
+            return
+
+        text = item.text
+        if self.mode == 'AUTOCOMPLETE':
+            with item.trace.span('apply'):
+                writer = TextStreamWriter(text)
+                for kind, data in result.events:
+                    writer.feed(kind, data)
+                writer.finish()
+            if writer.problems:
+                item.report["syntax_errors"] = [f"line {line + 1}: {message}" for line, message in writer.problems]
+            self._finish(item, "completed")
+        elif item.fix_mode == 'PATCH':
+            try:
+                edits, _ = patching.build_patch(item.original, result.content)
+            except patching.PatchError as e:
+                patching.record(False)
+                if item.cache is not None:
+                    item.cache.discard(item.cache_key)
+                item.report["patch_error"] = str(e)
+                item.fix_mode = 'FULL'
+                self._submit(item, prompts.fix_payload(self.prefs, item.error_data, 'FULL', item.text))
+                return
+            patching.record(True)
+            with item.trace.span('apply'):
+                patching.apply_to_text(text, edits, item.original.count('\n') + 1)
+            item.report["edits"] = len(edits)
+            self._finish(item, "fixed")
+        else:
+            if not result.content:
+                item.report["error"] = "Empty response from the API"
+                self._finish(item, "error")
+                return
+            with item.trace.span('apply'):
+                text.clear()
+                writer = TextStreamWriter(text, headers=False)
+                for kind, data in result.events:
+                    if kind == 'content':
+                        writer.feed(kind, data)
+                writer.finish()
+            if writer.problems:
+                item.report["syntax_errors"] = [f"line {line + 1}: {message}" for line, message in writer.problems]
+            self._finish(item, "fixed")
+
+    def _finish(self, item, status):
+        report = item.report
+        report["status"] = status
+        report["seconds"] = round(time.perf_counter() - item.started, 3)
+        trace = tracing.finish(item.trace, status, report.get("completion_tokens"), tracing.log_path(self.prefs))
+        report["spans_ms"] = trace["spans_ms"]
+        if status == "fixed":
+            # Problems the static checks still find in the result
+            remaining = preflight.analyze(item.text.as_string(), item.text.name)
+            report["remaining_problems"] = [problem.message.splitlines()[-1] for problem in remaining]
+        if status in ("fixed", "completed") and item.output:
+            os.makedirs(os.path.dirname(item.output) or '.', exist_ok=True)
+            with open(item.output, 'w', encoding='utf-8') as f:
+                f.write(item.text.as_string())
+            report["output"] = item.output
+
+        self.reports.append(report)
+        if self.report_file:
+            # One line per script as soon as it is done, so an interrupted run keeps its results
+            self.report_file.write(json.dumps(report, ensure_ascii=False) + '\n')
+            self.report_file.flush()
+        print(f"[DeepSeek] {report['source']}: {status}")
+
+
+def collect_files(inputs, output_dir=None, in_place=False):
+    """(path, output path) of the .py files in inputs, directories searched recursively"""
+    found = []
+    for root in inputs:
+        if os.path.isdir(root):
+            paths = []
+            for folder, _, names in os.walk(root):
+                paths.extend(os.path.join(folder, name) for name in names if name.endswith('.py'))
+            base = root
+        else:
+            paths = [root]
+            base = os.path.dirname(root)
+        for path in sorted(paths):
+            if in_place:
+                output = path
+            elif output_dir:
+                output = os.path.join(output_dir, os.path.relpath(path, base))
+            else:
+                output = None
+            found.append((path, output))
+    return found
+
+
+def run_batch(mode, texts=(), files=(), prefs=None, workers=None, report_path=None, execute=False):
+    """Run mode ('FIX' or 'AUTOCOMPLETE') over Text blocks and (path, output) files.
+
+    Files are loaded into temporary Text blocks that are removed
+    afterwards; Text blocks passed in are changed in place. Returns the
+    report of every script and, with report_path, writes it as JSONL.
+    """
+    if prefs is None:
+        prefs = batch_settings(find_preferences())
+    workers = workers or prefs.max_concurrent_jobs
+    # Every worker needs its own pooled connection
+    prefs.pool_size = max(prefs.pool_size, workers)
+
+    items = [BatchItem(text) for text in texts]
+    temporary = []
+    for path, output in files:
+        with open(path, encoding='utf-8') as f:
+            code = f.read()
+        text = bpy.data.texts.new(os.path.basename(path))
+        text.from_string(code)
+        temporary.append(text)
+        items.append(BatchItem(text, path, output))
+
+    # No timers index in the background here
+    if prefs.project_context_tokens:
+        project_index.update_all(prefs)
+    if prefs.api_context_tokens:
+        api_index.get_index()
+
+    report_file = open(report_path, 'w', encoding='utf-8') if report_path else None
+    try:
+        return BatchRunner(prefs, mode, workers, report_file, execute).run(items)
+    finally:
+        if report_file:
+            report_file.close()
+        for text in temporary:
+            bpy.data.texts.remove(text)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="batch.py", description=__doc__.split('\n')[0])
+    parser.add_argument("--mode", choices=("fix", "autocomplete"), default="fix")
+    parser.add_argument("--input", nargs='*', default=[], help=".py files or directories")
+    parser.add_argument("--texts", nargs='*', help="Text datablocks of the open .blend (all when empty)")
+    parser.add_argument("--output", help="Directory for the results of --input files")
+    parser.add_argument("--in-place", action='store_true', help="Overwrite --input files with the results")
+    parser.add_argument("--save", action='store_true', help="Save the .blend after changing --texts")
+    parser.add_argument("--report", default="deepseek_batch_report.jsonl", help="JSONL report path")
+    parser.add_argument("--workers", type=int, help=f"Concurrent requests (default: Max Concurrent Requests, at most {WORKER_THREADS})")
+    parser.add_argument("--api-key", help="Defaults to $DEEPSEEK_API_KEY, then the add-on preferences")
+    parser.add_argument("--execute", action='store_true', help="Also run scripts that pass the static checks")
+    parser.add_argument("--execute-budget", type=float, help="Seconds a script may run with --execute")
+    args = parser.parse_args(argv)
+
+    if args.input and not (args.output or args.in_place):
+        parser.error("--input needs --output or --in-place")
+
+    prefs = batch_settings(find_preferences())
+    api_key = args.api_key or os.getenv("DEEPSEEK_API_KEY")
+    if api_key:
+        prefs.api_key = api_key
+    if args.execute_budget:
+        prefs.fix_execute_budget = args.execute_budget
+
+    texts = []
+    if args.texts is not None:
+        texts = [bpy.data.texts[name] for name in args.texts] if args.texts else list(bpy.data.texts)
+    files = collect_files(args.input, args.output, args.in_place)
+
+    start = time.perf_counter()
+    reports = run_batch(args.mode.upper(), texts, files, prefs, args.workers, args.report, args.execute)
+    if args.save and texts and bpy.data.filepath:
+        bpy.ops.wm.save_mainfile()
+
+    counts = {}
+    for report in reports:
+        counts[report["status"]] = counts.get(report["status"], 0) + 1
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"[DeepSeek] {len(reports)} scripts in {time.perf_counter() - start:.1f}s: {summary}")
+    print(f"[DeepSeek] Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
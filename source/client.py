@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import ratelimit, workers
+from .config import BACKOFF_BASE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, RETRY_AFTER_MAX
+
+_sessions = {}
+# Origin -> pool size the session's adapter was mounted with
+_pool_sizes = {}
+_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url, pool_size=DEFAULT_POOL_SIZE):
+    """Return the keep-alive session shared by every request to url's host.
+
+    A new pool_size mounts a new adapter; streams still reading keep their
+    connections from the old one.
+    """
+    origin = _origin(url)
+    with _lock:
+        session = _sessions.get(origin)
+        if session is None:
+            session = _sessions[origin] = requests.Session()
+        if _pool_sizes.get(origin) != pool_size:
+            session.mount(origin, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+            _pool_sizes[origin] = pool_size
+        return session
+
+
+def build_headers(prefs):
+    # OpenAI endpoints read the key from the environment, like before
+    if prefs.api_url.startswith("https://api.openai.com"):
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OpenAI API key not found in environment variables")
+    else:
+        api_key = prefs.api_key
+
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+def post_chat(prefs, payload, stream=False, url=None):
+    """POST a chat completion request through the pooled session.
+
+    url overrides the API URL, for the fill-in-the-middle endpoint.
+    """
+    url = url or prefs.api_url
+    session = get_session(url, prefs.pool_size)
+    return session.post(
+        url,
+        headers=build_headers(prefs),
+        json=payload,
+        timeout=(prefs.connect_timeout, prefs.read_timeout),
+        stream=stream
+    )
+
+
+def open_stream(prefs, payload, trace, job=None, url=None):
+    """POST a streamed chat request within the rate limits, retrying failed attempts.
+
+    Waits for the API URL's requests/min and tokens/min budgets, then
+    retries 429 and 5xx answers and connection errors up to
+    prefs.max_retries times, after the provider's Retry-After or a jittered
+    backoff. The waits go into the 'queue' span of trace and are reported
+    to job as 'info' events. Returns the last response whatever its status;
+    raises ratelimit.CircuitOpenError while the endpoint is down and
+    ratelimit.Cancelled when job is cancelled during a wait. url overrides
+    the API URL like in post_chat.
+    """
+    limiter = ratelimit.get_limiter(prefs, url)
+    breaker = ratelimit.get_breaker(prefs, url)
+    tokens = ratelimit.estimate_tokens(payload)
+    retry = 0
+    while True:
+        probe = breaker.check()
+        try:
+            delay = limiter.reserve(tokens)
+            if delay and _wait(trace, job, delay, f"Waiting {delay:.1f}s for the API rate limit"):
+                limiter.refund(tokens)
+                raise ratelimit.Cancelled("Request cancelled")
+
+            ratelimit.stats["requests"] += 1
+            try:
+                with trace.span('connect'):
+                    response = post_chat(prefs, payload, stream=True, url=url)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if breaker.failure() or retry >= prefs.max_retries or (job is not None and job.cancelled):
+                    raise
+                delay = ratelimit.backoff(retry)
+                reason = f"Connection error ({e.__class__.__name__})"
+            else:
+                if job is not None:
+                    job.attach(response)
+                status = response.status_code
+                if status not in ratelimit.RETRY_STATUSES:
+                    breaker.success()
+                    return response
+                if status == 429:
+                    # Throttled, but the endpoint is up
+                    breaker.success()
+                elif breaker.failure():
+                    return response
+                if retry >= prefs.max_retries:
+                    return response
+                after = ratelimit.retry_after(response)
+                if after is None:
+                    delay = ratelimit.backoff(retry)
+                else:
+                    if after > RETRY_AFTER_MAX:
+                        return response
+                    if status == 429:
+                        # The quota is shared: hold back every request, not just this one
+                        limiter.pause(after)
+                    # Jitter so the team's clients do not all come back at once
+                    delay = after + random.uniform(0, BACKOFF_BASE)
+                response.close()
+                reason = f"HTTP {status}"
+        except BaseException:
+            if probe:
+                breaker.release()
+            raise
+
+        retry += 1
+        ratelimit.stats["retries"] += 1
+        if _wait(trace, job, delay, f"{reason}, retrying in {delay:.1f}s ({retry}/{prefs.max_retries})"):
+            raise ratelimit.Cancelled("Request cancelled")
+
+
+def _wait(trace, job, seconds, message):
+    """Sleep in the 'queue' span of trace; True if job was cancelled meanwhile"""
+    print(f"[DeepSeek] {message}")
+    start = time.perf_counter()
+    with trace.span('queue'):
+        if job is None:
+            time.sleep(seconds)
+            cancelled = False
+        else:
+            job.put(('info', message))
+            cancelled = job.wait(seconds)
+    ratelimit.stats["waited"] += time.perf_counter() - start
+    return cancelled
+
+
+def warm_up(url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_CONNECT_TIMEOUT):
+    """Open a connection to url in the background so the first request skips the handshake"""
+    def _warm():
+        try:
+            get_session(url, pool_size).head(_origin(url), timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"[DeepSeek] Connection warm-up failed: {e}")
+
+    workers.submit(_warm)
+
+
+def close_all():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _pool_sizes.clear()
@@ -0,0 +1,229 @@
+import ast
+import builtins
+import keyword
+import re
+
+from .config import CHARS_PER_TOKEN, CONTEXT_NEAR_LINES, CONTEXT_AFTER_LINES
+
+_BLOCK_START_RE = re.compile(r'[A-Za-z_@]')
+_SCOPE_RE = re.compile(r'(\s*)(?:async\s+)?(?:def|class)\s')
+_IDENT_RE = re.compile(r'[A-Za-z_]\w*')
+_CONTINUATIONS = {'else', 'elif', 'except', 'finally'}
+_IGNORED_NAMES = set(keyword.kwlist) | set(dir(builtins)) | {'self', 'cls', 'bpy'}
+
+GAP_MARKER = "# ..."
+AFTER_CURSOR_MARKER = "# [Code after the cursor]:"
+
+# One builder per Text block; keep the cache bounded when many blocks are used
+_MAX_BUILDERS = 16
+_builders = {}
+
+
+class Scope:
+    """A def/class inside a block, with line numbers relative to the block"""
+    __slots__ = ("name", "start", "end", "header_end")
+
+    def __init__(self, node):
+        self.name = node.name
+        first = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        self.start = first - 1
+        self.end = node.end_lineno
+        body = node.body[0]
+        if (isinstance(body, ast.Expr) and isinstance(body.value, ast.Constant)
+                and isinstance(body.value.value, str)):
+            # Signature plus docstring
+            self.header_end = body.end_lineno
+        else:
+            self.header_end = max(body.lineno - 1, node.lineno)
+
+
+class Block:
+    """A top-level statement group, parsed once and cached by its source"""
+
+    def __init__(self, source):
+        self.is_import = False
+        self.scopes = []
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            # Usually the block being typed in; it still counts as plain lines
+            return
+
+        self.is_import = bool(tree.body) and all(
+            isinstance(node, (ast.Import, ast.ImportFrom)) for node in tree.body)
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.scopes.append(Scope(node))
+                if isinstance(node, ast.ClassDef):
+                    for child in node.body:
+                        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                            self.scopes.append(Scope(child))
+
+
+def split_blocks(lines):
+    """Return (start, end) line ranges of the top-level statements in lines"""
+    starts = [0]
+    previous = ""
+    for i, line in enumerate(lines):
+        if i and _BLOCK_START_RE.match(line) and not previous.startswith('@'):
+            word = line.split(None, 1)[0].rstrip(':')
+            if word not in _CONTINUATIONS:
+                starts.append(i)
+        if line.strip():
+            previous = line
+    ends = starts[1:] + [len(lines)]
+    return list(zip(starts, ends))
+
+
+class CodeContextBuilder:
+    """Token-budgeted code context around the cursor for one Text block.
+
+    Top-level blocks are parsed with ``ast`` and cached by their source, so
+    only blocks that changed since the last request are parsed again.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+
+    def _index(self, lines):
+        blocks = {}
+        ranges = []
+        for start, end in split_blocks(lines):
+            source = '\n'.join(lines[start:end])
+            block = blocks.get(source) or self._blocks.get(source)
+            if block is None:
+                block = Block(source)
+            blocks[source] = block
+            ranges.append((start, end, block))
+        self._blocks = blocks
+        return ranges
+
+    def build(self, lines, line_index, character, max_tokens):
+        budget = max_tokens * CHARS_PER_TOKEN
+        ranges = self._index(lines)
+        selected = {}
+        used = 0
+
+        def take(start, end, limit=budget):
+            nonlocal used
+            cost = sum(len(lines[i]) + 1 for i in range(start, end) if i not in selected)
+            if used + cost > limit:
+                return False
+            for i in range(start, end):
+                selected.setdefault(i, lines[i])
+            used += cost
+            return True
+
+        current = lines[line_index]
+        selected[line_index] = current[:character]
+        used += character
+
+        # Lines right before the cursor matter most
+        first = line_index
+        while first > max(0, line_index - CONTEXT_NEAR_LINES) and take(first - 1, first, budget // 2):
+            first -= 1
+
+        for start, end, block in ranges:
+            if block.is_import:
+                take(start, end)
+
+        # Headers of the functions/classes the cursor is in
+        indent = len(current) - len(current.lstrip())
+        for i in range(line_index - 1, -1, -1):
+            if not indent:
+                break
+            match = _SCOPE_RE.match(lines[i])
+            if match and len(match.group(1)) < indent:
+                take(i, i + 1)
+                indent = len(match.group(1))
+
+        # Definitions of the symbols referenced near the cursor
+        definitions = {}
+        for start, end, block in ranges:
+            for scope in block.scopes:
+                definitions.setdefault(scope.name, (start, scope))
+        near = '\n'.join(lines[first:line_index] + [selected[line_index]])
+        seen = set()
+        for name in reversed(_IDENT_RE.findall(near)):
+            if name in seen or name in _IGNORED_NAMES or name not in definitions:
+                continue
+            seen.add(name)
+            start, scope = definitions[name]
+            if not take(start + scope.start, start + scope.end, min(budget, used + budget // 4)):
+                take(start + scope.start, start + scope.header_end)
+
+        # A few lines after the cursor, then widen the window backwards
+        suffix = current[character:]
+        used += len(suffix)
+        after_limit = min(budget, used + budget // 8)
+        last = line_index + 1
+        while last < min(len(lines), line_index + 1 + CONTEXT_AFTER_LINES) and take(last, last + 1, after_limit):
+            last += 1
+
+        while first > 0 and take(first - 1, first):
+            first -= 1
+
+        return self._render(selected, line_index, suffix)
+
+    def _render(self, selected, line_index, suffix):
+        out = []
+        after = [suffix] if suffix.strip() else []
+        previous = -1
+        for i in sorted(selected):
+            target = out if i <= line_index else after
+            if i != previous + 1:
+                target.append(GAP_MARKER)
+            target.append(selected[i])
+            previous = i
+
+        if any(line.strip() for line in after):
+            out.append("")
+            out.append(AFTER_CURSOR_MARKER)
+            out.extend(after)
+        return '\n'.join(out)
+
+
+def _lines_within(lines, budget):
+    """How many of lines, counted from the first, fit in budget characters"""
+    used = count = 0
+    for line in lines:
+        used += len(line) + 1
+        if used > budget:
+            break
+        count += 1
+    return count
+
+
+def fim_context(text_block, max_tokens):
+    """(prefix, suffix) around the cursor of text_block for fill-in-the-middle.
+
+    The prefix gets three quarters of the max_tokens budget and the suffix
+    the rest, both cut at whole lines; the cursor line is always included.
+    """
+    lines = text_block.as_string().split('\n')
+    line_index = min(text_block.current_line_index, len(lines) - 1)
+    character = text_block.current_character
+    budget = max_tokens * CHARS_PER_TOKEN
+    current = lines[line_index]
+
+    before = lines[:line_index]
+    keep = _lines_within(reversed(before), budget * 3 // 4 - character)
+    prefix = '\n'.join(before[len(before) - keep:] + [current[:character]])
+
+    after = [current[character:]] + lines[line_index + 1:]
+    keep = max(1, _lines_within(after, budget // 4))
+    suffix = '\n'.join(after[:keep])
+    return prefix, suffix
+
+
+def build_code_context(text_block, max_tokens):
+    """Code context around the cursor of text_block, within max_tokens"""
+    key = text_block.name_full
+    builder = _builders.pop(key, None) or CodeContextBuilder()
+    _builders[key] = builder
+    if len(_builders) > _MAX_BUILDERS:
+        del _builders[next(iter(_builders))]
+
+    lines = text_block.as_string().split('\n')
+    line_index = min(text_block.current_line_index, len(lines) - 1)
+    return builder.build(lines, line_index, text_block.current_character, max_tokens)
@@ -1,25 +1,26 @@
 DEFAULT_API_URL = "https://api.deepseek.com/chat/completions"
+DEFAULT_FIM_URL = "https://api.deepseek.com/beta/completions"
 DEFAULT_MODEL = "deepseek-chat"
 DEFAULT_MODEL_FIX_ERRORS = "deepseek-chat"
 DEFAULT_MAX_TOKENS = 8000
+DEFAULT_FIM_MAX_TOKENS = 64
 DEFAULT_TEMPERATURE = 0.5
 DEFAULT_TOP_P = 0.95
 DEFAULT_FREQUENCY_PENALTY = 0.0
 DEFAULT_PRESENCE_PENALTY = 0.0
-DEFAULT_PROMPT = (
+DEFAULT_SYSTEM_PROMPT = (
     "Continue the Blender Python code STRICTLY FOLLOWING:\n"
     "1. ONLY valid Python code WITHOUT markdown\n"
     "2. Use # comments ONLY for brief technical notes\n"
     "3. Maintain the existing code style\n"
     "4. Respond EXCLUSIVELY with the new necessary code\n\n"
-    "5. Feel free to completely REWRITE the code if the user's request requires a different approach\n\n"
+    "5. Feel free to completely REWRITE the code if the user's request requires a different approach\n"
+)
+DEFAULT_PROMPT = (
     "Current context:\n"
     "'''\n"
     "{code_context}\n"
     "'''\n\n"
-    "'''\n"
-    "{scene_context}\n"
-    "'''\n\n"
     "New request: "
 )
 DEFAULT_ERROR_PROMPT = (
@@ -31,4 +32,100 @@ DEFAULT_ERROR_PROMPT = (
     "1. Provide ONLY the corrected code\n"
     "2. Add comments ONLY to the corrected lines of code\n"
     "3. Maintain the original code style\n"
-)
\ No newline at end of file
+)
+DEFAULT_ERROR_DIFF_PROMPT = (
+    "Fix this Blender Python code based on the error:\n"
+    "Error: {error}\n"
+    "Console output:\n'''\n{console_output}\n'''\n"
+    "Original code (the line numbers are not part of the code):\n'''\n{code}\n'''\n"
+    "Instructions:\n"
+    "1. Respond ONLY with a unified diff against the original code (@@ -start,count +start,count @@ hunks)\n"
+    "2. Include 2 unchanged context lines around every change and do NOT include line numbers in the diff lines\n"
+    "3. Add comments ONLY to the corrected lines of code\n"
+    "4. Maintain the original code style\n"
+)
+
+# UI apply scheduling for the modal operators
+DEFAULT_FRAME_BUDGET_MS = 4.0
+TIMER_FAST_INTERVAL = 1.0 / 60.0
+TIMER_IDLE_INTERVAL = 0.5
+TIMER_BACKOFF = 2.0
+
+# HTTP client
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 120.0
+DEFAULT_POOL_SIZE = 4
+
+# Rate limits, retries and the circuit breaker (0 = no client-side limit)
+DEFAULT_RATE_LIMIT_RPM = 0
+DEFAULT_RATE_LIMIT_TPM = 0
+DEFAULT_MAX_RETRIES = 3
+# Seconds' worth of the per-minute limits that may go out at once
+RATE_LIMIT_BURST = 1.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# Longer Retry-After waits fail right away instead of holding the request
+RETRY_AFTER_MAX = 120.0
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30.0
+
+# Code context sent with autocomplete requests
+DEFAULT_MAX_CONTEXT_TOKENS = 3000
+CHARS_PER_TOKEN = 4
+CONTEXT_NEAR_LINES = 60
+CONTEXT_AFTER_LINES = 20
+
+# bpy API signatures retrieved into prompts
+DEFAULT_API_CONTEXT_TOKENS = 400
+# Seconds between checks whether the API index should be loaded in the background, starting after register
+API_INDEX_INTERVAL = 2.0
+
+# Definitions from other Text blocks and module files retrieved into prompts
+DEFAULT_PROJECT_CONTEXT_TOKENS = 600
+PROJECT_INDEX_INTERVAL = 0.5
+# Text blocks checked for changes per timer tick
+PROJECT_TEXTS_PER_TICK = 16
+PROJECT_RESCAN_INTERVAL = 10.0
+# Bounds on what is indexed: module files, size per source, definitions per source
+PROJECT_MAX_FILES = 500
+PROJECT_MAX_FILE_BYTES = 512 * 1024
+PROJECT_MAX_SYMBOLS = 200
+
+# Autocomplete conversation memory per Text block
+DEFAULT_SESSION_TOKENS = 2000
+SESSION_MAX_SESSIONS = 16
+# Lines before the cursor kept as the request of a turn
+SESSION_REQUEST_LINES = 6
+# Compacted requests listed in the system message
+SESSION_SUMMARY_ITEMS = 20
+
+# Scene summary sent with autocomplete requests
+DEFAULT_SCENE_MAX_LISTED = 20
+
+# Persistent response cache
+DEFAULT_RESPONSE_CACHE_SIZE_MB = 64
+DEFAULT_RESPONSE_CACHE_MAX_AGE_DAYS = 30
+
+# Request jobs
+DEFAULT_MAX_CONCURRENT_JOBS = 4
+DEFAULT_DEBOUNCE_MS = 300
+# Blocking requests running at once on the background worker pool
+WORKER_THREADS = 16
+
+# Hedged and multi-candidate generation
+DEFAULT_HEDGE_DELAY = 4.0
+DEFAULT_HEDGE_CANDIDATES = 2
+DEFAULT_HEDGE_TOKEN_BUDGET = 20000
+HEDGE_MIN_SAMPLES = 5
+
+# Speculative cursor completions while typing pauses
+DEFAULT_PREFETCH_IDLE_MS = 600
+DEFAULT_PREFETCH_TOKEN_BUDGET = 50000
+PREFETCH_CACHE_SIZE = 32
+PREFETCH_POLL_INTERVAL = 0.1
+
+# Fix Errors pre-flight
+DEFAULT_FIX_EXECUTE_BUDGET = 10.0
+
+# Request latency traces kept for the metrics panel
+TRACE_BUFFER_SIZE = 200
@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from . import client, ratelimit, workers
+from .config import CHARS_PER_TOKEN, HEDGE_MIN_SAMPLES
+from .jobs import Job
+from .streaming import iter_stream_events, sanitize
+
+# Time to first token of recent requests, for the p95 hedge deadline
+_ttft_samples = deque(maxlen=100)
+
+# Session totals: hedged requests, wins by a non-primary attempt, tokens
+# spent by extra attempts and the tail latency those wins saved
+stats = {"hedged": 0, "won": 0, "extra_tokens": 0, "saved": 0.0}
+# Budget held by extra attempts still streaming, beyond what they spent so far
+_reserved = 0
+_budget_lock = threading.Lock()
+
+def record_ttft(seconds):
+    _ttft_samples.append(seconds)
+
+
+def hedge_deadline(default):
+    """p95 of the recent time to first token, or default until enough samples exist"""
+    if len(_ttft_samples) < HEDGE_MIN_SAMPLES:
+        return default
+    ordered = sorted(_ttft_samples)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+def compiles(content):
+    try:
+        compile(sanitize(content), "<candidate>", 'exec')
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def _release(attempt, tokens, spent=False):
+    """Stop holding up to tokens of attempt's reservation, because they were spent or will never be"""
+    global _reserved
+    with _budget_lock:
+        if spent:
+            stats["extra_tokens"] += tokens
+        tokens = min(tokens, attempt.reserved)
+        attempt.reserved -= tokens
+        _reserved -= tokens
+
+
+class Attempt(Job):
+    """One of the concurrent requests; cancellable like a job"""
+
+    def __init__(self, index):
+        super().__init__('ATTEMPT', index)
+        self.index = index
+        self.events = []
+        self.usage = None
+        self.first_token = None
+        self.finished = False
+        self.error = None
+        # Budget still held for this attempt
+        self.reserved = 0
+
+
+class HedgedGeneration:
+    """Race identical requests and keep the first answer that compiles.
+
+    In HEDGE mode a second request starts only if the first one has not
+    produced a token by the p95 deadline; in CANDIDATES mode all requests
+    start at once. The first attempt to produce a token streams live into
+    the job; if another attempt wins, the job gets a 'reset' event followed
+    by the winner's events. Extra attempts are limited by a token budget:
+    each one reserves its max_tokens before it starts, so attempts launched
+    together can never spend more than the budget, and gives back what it
+    did not use when it ends.
+
+    run() is a coroutine for the worker loop: it only polls while the
+    attempts stream in the worker pool.
+    """
+
+    def __init__(self, job, prefs, payload, recorder):
+        self.job = job
+        self.prefs = prefs
+        self.payload = payload
+        self.recorder = recorder
+        self.attempts = []
+        self.leader = None
+        self.winner = None
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+
+    async def run(self):
+        with self.lock:
+            self._launch()
+            if self.prefs.hedge_mode == 'CANDIDATES':
+                for _ in range(self.prefs.hedge_candidates - 1):
+                    self._launch()
+        deadline = self.start_time + hedge_deadline(self.prefs.hedge_delay)
+
+        try:
+            while True:
+                with self.lock:
+                    if self.winner is not None or all(a.finished for a in self.attempts) or self.job.cancelled:
+                        break
+                    if (self.prefs.hedge_mode == 'HEDGE' and self.leader is None
+                            and len(self.attempts) == 1 and time.perf_counter() >= deadline):
+                        print(f"[DeepSeek] No token after {deadline - self.start_time:.2f}s, hedging")
+                        self._launch()
+                await asyncio.sleep(0.05)
+
+            with self.lock:
+                if self.winner is None and not self.job.cancelled:
+                    self._settle_without_winner()
+        finally:
+            for attempt in self.attempts:
+                if attempt is not self.winner:
+                    attempt.cancel()
+
+    def _launch(self):
+        global _reserved
+        payload = self.payload
+        attempt = Attempt(len(self.attempts))
+        if self.attempts:
+            with _budget_lock:
+                remaining = self.prefs.hedge_token_budget - stats["extra_tokens"] - _reserved
+                if remaining <= 0:
+                    print("[DeepSeek] Hedge token budget spent, not starting another request")
+                    return
+                attempt.reserved = min(payload.get("max_tokens", remaining), remaining)
+                _reserved += attempt.reserved
+            payload = dict(payload, max_tokens=attempt.reserved)
+            stats["hedged"] += 1
+        attempt.launched = time.perf_counter()
+        self.attempts.append(attempt)
+        workers.submit(self._stream, attempt, payload)
+
+    def _stream(self, attempt, payload):
+        try:
+            response = client.open_stream(self.prefs, payload, attempt.trace, attempt)
+            if response.status_code != 200:
+                self._on_event(attempt, ('error', f"HTTP Error {response.status_code}"))
+                return
+            for event in iter_stream_events(response, attempt.trace):
+                if attempt.cancelled:
+                    return
+                self._on_event(attempt, event)
+        except Exception as e:
+            if not attempt.cancelled:
+                self._on_event(attempt, ('error', f"Connection error: {str(e)}"))
+        finally:
+            _release(attempt, attempt.reserved)
+
+    def _on_event(self, attempt, event):
+        kind, data = event
+        now = time.perf_counter()
+        with self.lock:
+            if attempt.finished or self.winner is not None:
+                return
+
+            if kind in ('reasoning', 'content'):
+                attempt.events.append(event)
+                if attempt.index:
+                    _release(attempt, max(1, len(data) // CHARS_PER_TOKEN), spent=True)
+                if attempt.first_token is None:
+                    attempt.first_token = now - self.start_time
+                    record_ttft(now - attempt.launched)
+                if self.leader is None:
+                    self.leader = attempt
+                    for buffered in attempt.events:
+                        self._deliver(buffered)
+                elif self.leader is attempt:
+                    self._deliver(event)
+            elif kind == 'usage':
+                attempt.usage = data
+                ratelimit.spend(self.prefs, data)
+            elif kind == 'done':
+                attempt.finished = True
+                content = ''.join(text for k, text in attempt.events if k == 'content')
+                if compiles(content):
+                    self._win(attempt)
+                else:
+                    print(f"[DeepSeek] Candidate {attempt.index} does not compile")
+            elif kind == 'error':
+                attempt.finished = True
+                attempt.error = data
+
+    def _settle_without_winner(self):
+        # Nothing compiled: fall back to the live stream, then any complete answer
+        complete = [a for a in self.attempts if a.error is None]
+        if self.leader in complete:
+            self._win(self.leader)
+        elif complete:
+            self._win(complete[0])
+        else:
+            self.job.put(('error', self.attempts[0].error))
+
+    def _win(self, attempt):
+        self.winner = attempt
+        for other in self.attempts:
+            if other is not attempt:
+                other.cancel()
+
+        if attempt is not self.leader:
+            self.job.put(('reset', None))
+            self.job.trace.chars = 0
+            for event in attempt.events:
+                self._deliver(event)
+        if attempt.usage:
+            self.job.put(('usage', attempt.usage))
+
+        if attempt.index:
+            stats["won"] += 1
+            primary = self.attempts[0]
+            primary_ttft = primary.first_token
+            if primary_ttft is None:
+                # Lower bound: the primary had produced nothing by now
+                primary_ttft = time.perf_counter() - self.start_time
+            saved = max(0.0, primary_ttft - attempt.first_token)
+            stats["saved"] += saved
+            self.job.put(('info', f"Hedged request {attempt.index} won, saved at least {saved:.2f}s"))
+
+        for event in attempt.events:
+            self.recorder.record(event)
+        self.recorder.record(('done', None))
+        # The request that produced the answer stands for the job in its trace
+        for name in ('connect', 'parse'):
+            if name in attempt.trace.spans:
+                self.job.trace.add(name, attempt.trace.spans[name])
+        self._deliver(('done', None))
+
+    def _deliver(self, event):
+        self.job.trace.observe(event)
+        self.job.put(event)
@@ -0,0 +1,127 @@
+import itertools
+import threading
+import time
+import traceback
+from queue import Queue
+
+from . import tracing
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_active = {}
+_last_start = {}
+
+
+class JobRejected(Exception):
+    pass
+
+
+class Job:
+    """One operator invocation: its own event queue and cancellation state.
+
+    Worker threads push events with put(), which drops them once the job is
+    cancelled, so a stale thread can never feed a later invocation.
+    """
+
+    def __init__(self, kind, key):
+        self.id = next(_ids)
+        self.kind = kind
+        self.key = key
+        self.queue = Queue()
+        self.trace = tracing.Trace(kind)
+        self.started = self.trace.started
+        self._cancelled = threading.Event()
+        self._response = None
+        self._response_lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self, seconds):
+        """Sleep up to seconds; True if the job was cancelled meanwhile"""
+        return self._cancelled.wait(seconds)
+
+    def put(self, event):
+        if not self.cancelled:
+            self.queue.put(event)
+
+    def attach(self, response):
+        """Remember the HTTP response so cancel() can close its stream"""
+        with self._response_lock:
+            self._response = response
+            if self.cancelled:
+                response.close()
+        return response
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._response_lock:
+            if self._response is not None:
+                # Closing the socket makes the worker's read fail right away
+                self._response.close()
+
+
+def start(kind, key, max_jobs, debounce):
+    """Register a new job or raise JobRejected.
+
+    Repeated starts for the same key within ``debounce`` seconds, starts
+    while a job for that key is still running and starts beyond
+    ``max_jobs`` concurrent jobs are all rejected.
+    """
+    now = time.perf_counter()
+    with _lock:
+        # Starts older than the debounce no longer matter; without this every Text block ever used stays
+        for stale in [k for k, started in _last_start.items() if now - started >= debounce]:
+            del _last_start[stale]
+        if now - _last_start.get((kind, key), -debounce) < debounce:
+            raise JobRejected("Ignored repeated request")
+        if any(job.kind == kind and job.key == key for job in _active.values()):
+            raise JobRejected("A request for this text is already running (ESC to cancel)")
+        if len(_active) >= max_jobs:
+            raise JobRejected(f"Too many requests running (max {max_jobs})")
+        job = Job(kind, key)
+        _active[job.id] = job
+        _last_start[(kind, key)] = now
+        return job
+
+
+def finish(job):
+    with _lock:
+        _active.pop(job.id, None)
+
+
+def begin(operator, context, prefs):
+    """Return operator.begin(context, prefs) for the job it just started.
+
+    If begin() raises, the job is cancelled and finished, the operator's
+    scheduler stopped if it got that far and the error reported, instead
+    of leaving a job registered that would block its Text block and hold a
+    slot until Blender restarts.
+    """
+    operator.scheduler = None
+    try:
+        return operator.begin(context, prefs)
+    except Exception as e:
+        operator.job.cancel()
+        finish(operator.job)
+        if operator.scheduler is not None:
+            operator.scheduler.stop(context)
+        tracing.finish(operator.job.trace, 'error', log_path=tracing.log_path(prefs))
+        traceback.print_exc()
+        operator.report({'ERROR'}, f"Could not start the request: {e}")
+        return {'CANCELLED'}
+
+
+def running():
+    """Number of jobs currently running"""
+    with _lock:
+        return len(_active)
+
+
+def cancel_all():
+    with _lock:
+        jobs = list(_active.values())
+        _active.clear()
+    for job in jobs:
+        job.cancel()
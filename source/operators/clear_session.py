@@ -0,0 +1,19 @@
+from bpy.types import Operator
+from .. import sessions
+
+class DEEPSEEK_OT_ClearSession(Operator):
+    bl_idname = "text.deepseek_clear_session"
+    bl_label = "DeepSeek New Conversation"
+    bl_description = "Forget the earlier autocomplete requests and answers of this Text block"
+
+    @classmethod
+    def poll(cls, context):
+        return context.space_data is not None and getattr(context.space_data, "text", None) is not None
+
+    def execute(self, context):
+        text_block = context.space_data.text
+        session = sessions.get_session(text_block.name_full, create=False)
+        sessions.clear(text_block.name_full)
+        turns = len(session.turns) + len(session.summary) if session else 0
+        self.report({'INFO'}, f"Started a new conversation ({turns} earlier requests forgotten)")
+        return {'FINISHED'}
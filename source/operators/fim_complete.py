@@ -0,0 +1,151 @@
+import time
+from bpy.types import Operator
+from .. import client, jobs, prefetch, prompts, ratelimit, response_cache, tracing, usage, workers
+from ..code_context import fim_context
+from ..scheduler import ApplyScheduler
+from ..streaming import advance_position, iter_stream_events
+
+class DEEPSEEK_OT_FimComplete(Operator):
+    bl_idname = "text.deepseek_fim_complete"
+    bl_label = "DeepSeek Complete at Cursor"
+    bl_description = "Insert a short completion at the cursor using the code before and after it"
+
+    job = None
+    scheduler = None
+    text_block = None
+    line = 0
+    char = 0
+    inserted = ""
+    completion_tokens = None
+
+    @staticmethod
+    def stream_completion(job, prefs, payload, recorder):
+        """Worker streaming the fill-in-the-middle completion into the job's queue"""
+        try:
+            response = client.open_stream(prefs, payload, job.trace, job, url=prefs.fim_url)
+            if response.status_code != 200:
+                print(f"API error: Code {response.status_code} - {response.text}")
+                job.put(('error', f"HTTP Error {response.status_code}"))
+                return
+
+            for event in iter_stream_events(response, job.trace):
+                if job.cancelled:
+                    break
+                job.trace.observe(event)
+                if event[0] == 'usage':
+                    ratelimit.spend(prefs, event[1], prefs.fim_url)
+                job.put(event)
+                recorder.record(event)
+
+        except Exception as e:
+            job.put(('error', f"Connection error: {str(e)}"))
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.job.cancel()
+            self.cleanup(context, 'cancelled')
+            self.report({'WARNING'}, "Completion cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'RUNNING_MODAL'}
+
+        apply_start = time.perf_counter()
+        status = None
+        active = False
+        fragments = []
+        for data_type, data in self.scheduler.drain():
+            active = True
+            if data_type == 'content':
+                fragments.append(data)
+            elif data_type == 'usage':
+                self.completion_tokens = usage.record(data)[1]
+            elif data_type == 'info':
+                self.report({'INFO'}, data)
+            elif data_type in ('done', 'error'):
+                status = (data_type, data)
+                break
+
+        if fragments:
+            self.insert(context, ''.join(fragments))
+        self.job.trace.add('apply', time.perf_counter() - apply_start)
+
+        if status:
+            data_type, data = status
+            if data_type == 'done':
+                self.cleanup(context)
+                if not self.inserted.strip():
+                    self.report({'INFO'}, "No completion at the cursor")
+                return {'FINISHED'}
+            print(f"Error during completion: {data}")
+            self.report({'ERROR'}, data)
+            self.cleanup(context, 'error')
+            return {'CANCELLED'}
+
+        self.scheduler.settle(context, active)
+        return {'RUNNING_MODAL'}
+
+    def insert(self, context, text):
+        """Write text at the end of the completion so far; the suffix moves along"""
+        if not self.inserted:
+            # The model often repeats the indentation already before the cursor
+            current = self.text_block.lines[self.line].body[:self.char]
+            if not current.strip() and text.startswith(current):
+                text = text[len(current):]
+        self.text_block.cursor_set(self.line, character=self.char)
+        self.text_block.write(text)
+        self.line, self.char = advance_position(self.line, self.char, text)
+        # write() leaves the cursor at the end of the Text block; keep it after the completion
+        self.text_block.cursor_set(self.line, character=self.char)
+        self.inserted += text
+        context.area.tag_redraw()
+
+    def cleanup(self, context, status='done'):
+        self.text_block.cursor_set(self.line, character=self.char)
+        self.scheduler.stop(context)
+        jobs.finish(self.job)
+        addon_path = '.'.join(__name__.split('.')[:-2])
+        prefs = context.preferences.addons[addon_path].preferences
+        tracing.finish(self.job.trace, status, self.completion_tokens, tracing.log_path(prefs))
+
+    def invoke(self, context, event):
+        self.text_block = context.space_data.text
+        addon_path = '.'.join(__name__.split('.')[:-2])
+        prefs = context.preferences.addons[addon_path].preferences
+        try:
+            self.job = jobs.start('CURSOR_COMPLETE', self.text_block.name_full,
+                                  prefs.max_concurrent_jobs, prefs.debounce_ms / 1000.0)
+        except jobs.JobRejected as e:
+            self.report({'WARNING'}, str(e))
+            return {'CANCELLED'}
+
+        return jobs.begin(self, context, prefs)
+
+    def begin(self, context, prefs):
+        """Request the completion, unless a prefetched or cached one can be used; run by jobs.begin()"""
+        self.line = self.text_block.current_line_index
+        self.char = self.text_block.current_character
+        self.inserted = ""
+        self.completion_tokens = None
+
+        with self.job.trace.span('context'):
+            prefix, suffix = fim_context(self.text_block, prefs.max_context_tokens)
+            payload = prompts.fim_payload(prefs, prefix, suffix)
+        cache_key = response_cache.request_key(payload)
+        # A completion requested while typing paused is used as is, done or still streaming
+        if not prefetch.claim(cache_key, self.job):
+            cache = response_cache.get_cache(prefs, payload)
+            cached = response_cache.lookup(cache, cache_key) if cache else None
+            if cached is not None:
+                self.job.trace.cached = True
+                for event in cached:
+                    self.job.put(event)
+                self.job.put(('done', None))
+            else:
+                workers.submit(self.stream_completion, self.job, prefs, payload,
+                               response_cache.CacheRecorder(cache, cache_key))
+
+        self.scheduler = ApplyScheduler(self.job.queue, prefs.frame_budget_ms)
+        self.scheduler.start(context)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
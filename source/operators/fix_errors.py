@@ -1,132 +1,230 @@
 import bpy
-import sys
-import io
-import re
-import traceback
-import requests
-import threading
-from queue import Queue
+import time
 from bpy.types import Operator
+from .. import client, jobs, patching, preflight, prompts, ratelimit, response_cache, tracing, usage, workers
+from ..scheduler import ApplyScheduler
+from ..streaming import TextStreamWriter, iter_stream_events
 
 class DEEPSEEK_OT_FixErrors(Operator):
     bl_idname = "text.deepseek_fix_errors"
     bl_label = "DeepSeek Fix Errors"
     bl_description = "Fix Python errors using AI with real-time updates"
     
-    _timer = None
-    data_queue = Queue()
-    is_running = False
+    job = None
+    scheduler = None
     original_text = ""
     error_data = {}
+    text_block = None
+    writer = None
+    first_token_time = None
+    request_start = 0.0
+    mode = 'FULL'
+    patch_fragments = []
+    completion_tokens = 0
+    # Response cache and key of the current request, to drop a patch that does not apply
+    cache = None
+    cache_key = None
     
-    def execute_code(self, context):
-        text_block = context.space_data.text
-        code = text_block.as_string()
-        
-        old_stdout, old_stderr = sys.stdout, sys.stderr
-        output_buffer = io.StringIO()
-        sys.stdout = sys.stderr = output_buffer
-        
-        try:
-            namespace = {'__name__': '__main__', 'bpy': bpy}
-            exec(code, namespace)
-            error_occurred = False
-        except Exception as e:
-            error_occurred = True
-            traceback.print_exc(file=output_buffer)
-            self.error_data = {
-                "message": str(e),
-                "traceback": output_buffer.getvalue(),
-                "code": code
-            }
-        finally:
-            sys.stdout, sys.stderr = old_stdout, old_stderr
-            output_buffer.close()
-        
-        return error_occurred
+    @staticmethod
+    def send_to_deepseek(job, prefs, payload, recorder):
+        """Worker streaming the corrected code (or a patch for it) from DeepSeek API.
 
-    def send_to_deepseek(self, context):
-        """Thread for sending code to DeepSeek API"""
+        Static, so it never touches the operator, which may be gone by the
+        time the stream ends; everything goes through the job.
+        """
         try:
-            addon_path = '.'.join(__name__.split('.')[:-2])
-            prefs = context.preferences.addons[addon_path].preferences
-            
-            prompt = prefs.error_prompt.format(
-                code=self.error_data["code"],
-                error=self.error_data["message"],
-                console_output=self.error_data["traceback"]
-            )
+            response = client.open_stream(prefs, payload, job.trace, job)
             
-            response = requests.post(
-                prefs.api_url,
-                headers={"Authorization": f"Bearer {prefs.api_key}"},
-                json={
-                    "model": prefs.model_name_fix_errors,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": prefs.temperature,
-                    "top_p": prefs.top_p,
-                    "frequency_penalty": prefs.frequency_penalty,
-                    "presence_penalty": prefs.presence_penalty,
-                    "stream": False
-                },
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                corrected_code = self.clean_response(response.json()["choices"][0]["message"]["content"])
-                self.data_queue.put(('SUCCESS', corrected_code))
-            else:
-                self.data_queue.put(('ERROR', f"API Error: {response.status_code}"))
+            if response.status_code != 200:
+                job.put(('error', f"API Error: {response.status_code}"))
+                return
+
+            for event in iter_stream_events(response, job.trace):
+                if job.cancelled:
+                    break
+                job.trace.observe(event)
+                if event[0] == 'usage':
+                    ratelimit.spend(prefs, event[1])
+                # Stored before the operator sees 'done', so a bad patch can drop it again
+                recorder.record(event)
+                job.put(event)
                 
         except Exception as e:
-            self.data_queue.put(('ERROR', str(e)))
-        finally:
-            self.is_running = False
+            # After ESC the closed stream fails here and put() drops the error
+            job.put(('error', str(e)))
 
     def modal(self, context, event):
-        """Update UI and handle responses"""
-        if event.type == 'TIMER':
-            while not self.data_queue.empty():
-                status, data = self.data_queue.get()
-                
-                if status == 'SUCCESS':
-                    text_block = context.space_data.text
-                    text_block.clear()
-                    text_block.write(data)
+        """Stream the corrected code into the Text block and handle the result"""
+        if event.type == 'ESC':
+            self.job.cancel()
+            if self.writer:
+                self.text_block.from_string(self.original_text)
+                context.area.tag_redraw()
+            self.report({'WARNING'}, "Error correction cancelled")
+            self.cleanup(context, 'cancelled')
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'RUNNING_MODAL'}
+
+        apply_start = time.perf_counter()
+        status = None
+        active = False
+        for data_type, data in self.scheduler.drain():
+            active = True
+            if data_type in ('reasoning', 'content') and self.first_token_time is None:
+                self.first_token_time = time.perf_counter() - self.request_start
+                self.report({'INFO'}, f"First token after {self.first_token_time:.2f}s")
+
+            if data_type == 'content' and self.mode == 'PATCH':
+                self.patch_fragments.append(data)
+            elif data_type == 'content':
+                if self.writer is None:
+                    # The corrected file replaces the original as it arrives
+                    self.text_block.clear()
+                    self.writer = TextStreamWriter(self.text_block, headers=False)
+                self.writer.feed(data_type, data)
+            elif data_type == 'usage':
+                self.completion_tokens += usage.record(data)[1]
+            elif data_type == 'info':
+                self.report({'INFO'}, data)
+            elif data_type in ('done', 'error'):
+                status = (data_type, data)
+                break
+
+        if self.writer and self.writer.flush():
+            context.area.tag_redraw()
+        if self.writer:
+            for line, message in self.writer.new_problems():
+                self.report({'WARNING'}, f"Corrected code has a syntax error on line {line + 1}: {message}")
+        self.job.trace.add('apply', time.perf_counter() - apply_start)
+
+        if status:
+            data_type, data = status
+            if data_type == 'done' and self.mode == 'PATCH':
+                return self.apply_patch(context)
+
+            if data_type == 'done' and self.writer:
+                self.writer.finish()
+                problems = self.writer.problems
+                if problems:
+                    line, message = problems[-1]
+                    self.report({'WARNING'}, f"Code fixed, but line {line + 1} has a syntax error: {message}")
+                else:
                     self.report({'INFO'}, "Code fixed successfully!")
-                    self.cleanup(context)
-                    return {'FINISHED'}
-                
-                elif status == 'ERROR':
-                    self.report({'ERROR'}, data)
-                    self.cleanup(context)
-                    return {'CANCELLED'}
+                self.cleanup(context)
+                return {'FINISHED'}
+
+            # Keep the last complete version instead of a half-written fix
+            if self.writer:
+                self.text_block.from_string(self.original_text)
+            context.area.tag_redraw()
+            self.report({'ERROR'}, data or "Empty response from the API")
+            self.cleanup(context, 'error')
+            return {'CANCELLED'}
         
+        self.scheduler.settle(context, active)
+        return {'RUNNING_MODAL'}
+
+    def apply_patch(self, context):
+        """Apply the streamed diff in place, or fall back to regenerating the file"""
+        code = self.error_data["code"]
+        try:
+            edits, _ = patching.build_patch(code, ''.join(self.patch_fragments))
+        except patching.PatchError as e:
+            if self.cache is not None:
+                # Replaying it would fail the same way every time
+                self.cache.discard(self.cache_key)
+            return self.regenerate(context, e)
+        if self.text_block.as_string() != code:
+            return self.regenerate(context, "The code changed while waiting for the patch")
+
+        patching.record(True)
+        with self.job.trace.span('apply'):
+            patching.apply_to_text(self.text_block, edits, code.count('\n') + 1)
+        context.area.tag_redraw()
+        self.report({'INFO'}, f"Code fixed successfully! ({len(edits)} edits applied)")
+        self.cleanup(context)
+        return {'FINISHED'}
+
+    def regenerate(self, context, reason):
+        """Fall back to the full file after a patch that cannot be applied"""
+        patching.record(False)
+        print(f"[DeepSeek] Patch rejected: {reason}")
+        self.report({'WARNING'}, "Patch did not apply, regenerating the full file...")
+        self.start_request(context, 'FULL')
         return {'RUNNING_MODAL'}
 
+    def start_request(self, context, mode):
+        addon_path = '.'.join(__name__.split('.')[:-2])
+        prefs = context.preferences.addons[addon_path].preferences
+        self.mode = mode
+        self.patch_fragments = []
+        self.request_start = time.perf_counter()
+
+        with self.job.trace.span('context'):
+            payload = prompts.fix_payload(prefs, self.error_data, mode, self.text_block)
+        cache = self.cache = response_cache.get_cache(prefs, payload)
+        cache_key = self.cache_key = response_cache.request_key(payload) if cache else None
+        cached = response_cache.lookup(cache, cache_key) if cache else None
+        if cached is not None:
+            # Replayed through the same queue and apply path as a live stream
+            self.report({'INFO'}, "Replaying cached fix...")
+            self.job.trace.cached = True
+            for event in cached:
+                self.job.put(event)
+            self.job.put(('done', None))
+            return
+
+        workers.submit(self.send_to_deepseek, self.job, prefs, payload,
+                       response_cache.CacheRecorder(cache, cache_key))
+
     def invoke(self, context, event):
-        text_block = context.space_data.text
-        self.original_text = text_block.as_string()
+        self.text_block = context.space_data.text
+        addon_path = '.'.join(__name__.split('.')[:-2])
+        prefs = context.preferences.addons[addon_path].preferences
+        try:
+            self.job = jobs.start('FIX_ERRORS', self.text_block.name_full,
+                                  prefs.max_concurrent_jobs, prefs.debounce_ms / 1000.0)
+        except jobs.JobRejected as e:
+            self.report({'WARNING'}, str(e))
+            return {'CANCELLED'}
+
+        return jobs.begin(self, context, prefs)
+
+    def begin(self, context, prefs):
+        """Look for errors and request a fix for the first one found; run by jobs.begin()"""
+        self.original_text = self.text_block.as_string()
+        self.writer = None
+        self.first_token_time = None
+        self.completion_tokens = 0
         
-        if not self.execute_code(context):
-            self.report({'INFO'}, "No errors detected")
+        with self.job.trace.span('checks'):
+            self.error_data, note = preflight.find_errors(
+                self.original_text, self.text_block.name, prefs.fix_execute, prefs.fix_execute_budget)
+        if note:
+            self.report({'WARNING'}, note)
+        if self.error_data is None:
+            jobs.finish(self.job)
+            tracing.finish(self.job.trace, 'clean', log_path=tracing.log_path(prefs))
+            if prefs.fix_execute:
+                self.report({'INFO'}, "No errors detected")
+            else:
+                self.report({'INFO'}, "No errors found by static checks (enable script execution to catch runtime errors)")
             return {'FINISHED'}
         
-        self.is_running = True
-        threading.Thread(target=self.send_to_deepseek, args=(context,)).start()
+        self.start_request(context, prefs.fix_mode)
         
-        wm = context.window_manager
-        self._timer = wm.event_timer_add(0.1, window=context.window)
+        self.scheduler = ApplyScheduler(self.job.queue, prefs.frame_budget_ms)
+        self.scheduler.start(context)
         context.window_manager.modal_handler_add(self)
         
         self.report({'INFO'}, "Analyzing errors with DeepSeek...")
         return {'RUNNING_MODAL'}
 
-    def cleanup(self, context):
-        wm = context.window_manager
-        if self._timer:
-            wm.event_timer_remove(self._timer)
-        self._timer = None
-
-    def clean_response(self, response):
-        return re.sub(r'```\w*\s*', '', response).strip()
\ No newline at end of file
+    def cleanup(self, context, status='done'):
+        self.scheduler.stop(context)
+        jobs.finish(self.job)
+        addon_path = '.'.join(__name__.split('.')[:-2])
+        prefs = context.preferences.addons[addon_path].preferences
+        tracing.finish(self.job.trace, status, self.completion_tokens or None, tracing.log_path(prefs))
\ No newline at end of file
@@ -0,0 +1,33 @@
+from bpy.types import Panel
+from . import tracing
+
+
+class DEEPSEEK_PT_Metrics(Panel):
+    bl_idname = "TEXT_PT_deepseek_metrics"
+    bl_label = "DeepSeek Latency"
+    bl_space_type = 'TEXT_EDITOR'
+    bl_region_type = 'UI'
+    bl_category = "DeepSeek"
+
+    def draw(self, context):
+        layout = self.layout
+        summary = tracing.summary()
+        if not summary:
+            layout.label(text="No requests yet")
+            return
+
+        for kind, (count, rows) in summary.items():
+            box = layout.box()
+            box.label(text=f"{kind.replace('_', ' ').title()} ({count} requests)")
+            grid = box.grid_flow(row_major=True, columns=3, even_columns=True, align=True)
+            header = None
+            for metric, unit, p50, tail_name, tail in rows:
+                if tail_name != header:
+                    # Times and rates have their slow end on opposite sides
+                    header = tail_name
+                    grid.label(text="")
+                    grid.label(text="p50")
+                    grid.label(text=tail_name)
+                grid.label(text=metric)
+                grid.label(text=tracing.format_value(p50, unit))
+                grid.label(text=tracing.format_value(tail, unit))
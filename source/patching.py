@@ -0,0 +1,156 @@
+import re
+
+_HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# Applied-vs-fallback counters for the patch fix mode, per Blender session
+stats = {"applied": 0, "fallback": 0}
+
+
+class PatchError(Exception):
+    pass
+
+
+class Hunk:
+    def __init__(self, old_start):
+        self.old_start = old_start
+        self.old = []
+        self.new = []
+
+
+def number_lines(code):
+    """Prefix every line with its 1-based number so the model can address it"""
+    return '\n'.join(f"{i:>4}| {line}" for i, line in enumerate(code.split('\n'), 1))
+
+
+def parse_unified_diff(text):
+    hunks = []
+    hunk = None
+    blank = 0
+    for line in text.splitlines():
+        if line.startswith('```'):
+            continue
+        match = _HUNK_RE.match(line)
+        if match:
+            hunk = Hunk(int(match.group(1)))
+            hunks.append(hunk)
+            blank = 0
+            continue
+        if hunk is None:
+            # ---/+++ headers and any chatter before the first hunk
+            continue
+        if not line:
+            # Models often drop the leading space of blank context lines,
+            # but empty lines trailing a hunk are just formatting
+            blank += 1
+            continue
+        hunk.old.extend([''] * blank)
+        hunk.new.extend([''] * blank)
+        blank = 0
+        if line.startswith('+'):
+            hunk.new.append(line[1:])
+        elif line.startswith('-'):
+            hunk.old.append(line[1:])
+        elif line.startswith(' '):
+            hunk.old.append(line[1:])
+            hunk.new.append(line[1:])
+        elif line.startswith('\\'):
+            continue
+        else:
+            raise PatchError(f"Unexpected line in diff: {line!r}")
+
+    if not hunks:
+        raise PatchError("No hunks found in the response")
+    return hunks
+
+
+def _locate(lines, hunk, floor):
+    size = len(hunk.old)
+    hint = max(hunk.old_start - 1, floor)
+    if not size:
+        # Pure insertion: old_start is the line the new code follows
+        return min(max(hunk.old_start, floor), len(lines))
+
+    wanted = [line.rstrip() for line in hunk.old]
+    best = None
+    for start in range(floor, len(lines) - size + 1):
+        if all(lines[start + i].rstrip() == wanted[i] for i in range(size)):
+            if best is None or abs(start - hint) < abs(best - hint):
+                best = start
+    if best is None:
+        raise PatchError(f"Hunk at line {hunk.old_start} does not match the code")
+    return best
+
+
+def resolve_hunks(lines, hunks):
+    """Match every hunk against lines and return (start, end, new_lines) edits.
+
+    Hunks are located by their context, preferring the position closest to
+    the line number the model gave, and must not overlap.
+    """
+    edits = []
+    floor = 0
+    for hunk in hunks:
+        start = _locate(lines, hunk, floor)
+        end = start + len(hunk.old)
+        edits.append((start, end, hunk.new))
+        floor = end
+    return edits
+
+
+def apply_edits(lines, edits):
+    result = []
+    pos = 0
+    for start, end, new in edits:
+        result.extend(lines[pos:start])
+        result.extend(new)
+        pos = end
+    result.extend(lines[pos:])
+    return result
+
+
+def build_patch(code, response):
+    """Parse and validate a diff response against code.
+
+    Returns the edits and the patched code, or raises PatchError if the
+    diff does not apply or the result does not compile.
+    """
+    lines = code.split('\n')
+    edits = resolve_hunks(lines, parse_unified_diff(response))
+    patched = '\n'.join(apply_edits(lines, edits))
+    try:
+        compile(patched, "<patched>", 'exec')
+    except SyntaxError as e:
+        raise PatchError(f"Patched code does not compile: {e}")
+    return edits, patched
+
+
+def apply_to_text(text_block, edits, line_count):
+    """Apply edits in place, bottom-up so earlier line numbers stay valid"""
+    for start, end, new in reversed(edits):
+        if end < line_count:
+            text_block.select_set(start, 0, end, 0)
+            text_block.write(''.join(line + '\n' for line in new))
+        elif start < line_count:
+            last = text_block.lines[line_count - 1]
+            if new or not start:
+                text_block.select_set(start, 0, line_count - 1, len(last.body))
+                text_block.write('\n'.join(new))
+            else:
+                # Removing the tail also removes the newline before it
+                prev = text_block.lines[start - 1]
+                text_block.select_set(start - 1, len(prev.body), line_count - 1, len(last.body))
+                text_block.write('')
+        elif new:
+            last = text_block.lines[line_count - 1]
+            text_block.cursor_set(line_count - 1, character=len(last.body))
+            text_block.write('\n' + '\n'.join(new))
+        line_count += len(new) - (end - start)
+
+
+def record(applied):
+    stats["applied" if applied else "fallback"] += 1
+
+
+def applied_rate():
+    total = stats["applied"] + stats["fallback"]
+    return stats["applied"] / total if total else 0.0
@@ -0,0 +1,231 @@
+"""Speculative cursor completions requested while the user pauses typing.
+
+A timer watches the Text blocks shown in Text Editors. Once one has not
+changed for the idle time, the fill-in-the-middle request that Complete at
+Cursor would send for it goes out in the background, at most one at a time
+and only when no user request is running and the rate limit has room.
+Results are kept in a small LRU keyed by the request hash; typing cancels
+a prefetch that is still streaming. Every request is charged to a token
+budget before it is sent, so the session never spends more than that.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import bpy
+
+from . import client, jobs, project_index, prompts, ratelimit, response_cache, usage, workers
+from .code_context import fim_context
+from .config import CHARS_PER_TOKEN, PREFETCH_CACHE_SIZE, PREFETCH_POLL_INTERVAL
+from .jobs import Job
+from .streaming import iter_stream_events
+
+# Prefetches started, claimed by Complete at Cursor, cancelled by typing, and tokens charged
+stats = {"started": 0, "used": 0, "cancelled": 0, "spent": 0}
+
+# Request key -> Prefetch, least recently used first
+_entries = OrderedDict()
+_lock = threading.Lock()
+# Text name -> [signature, time it last changed, prefetch tried]
+_watched = {}
+
+
+class Prefetch:
+    """One speculative completion, streaming or done.
+
+    Events are kept as they arrive. Once claimed, the ones already there
+    are replayed into the operator's job and the rest are forwarded to it.
+    """
+
+    def __init__(self, key, text_name, reserved):
+        self.key = key
+        self.text_name = text_name
+        self.reserved = reserved
+        self.job = Job('PREFETCH', text_name)
+        self.events = []
+        self.done = False
+        self.failed = False
+        self.subscriber = None
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.job.cancelled or (self.subscriber is not None and self.subscriber.cancelled)
+
+    def add(self, event):
+        with self.lock:
+            if self.done:
+                return
+            self.events.append(event)
+            if event[0] in ('done', 'error'):
+                self.done = True
+                self.failed = event[0] == 'error'
+            if self.subscriber is not None:
+                self.subscriber.trace.observe(event)
+                self.subscriber.put(event)
+
+
+def _stream(entry, prefs, payload, recorder):
+    """Worker streaming one prefetch; settles its cost against the budget at the end"""
+    spent = None
+    try:
+        response = client.open_stream(prefs, payload, entry.job.trace, entry.job, url=prefs.fim_url)
+        if response.status_code != 200:
+            entry.add(('error', f"HTTP Error {response.status_code}"))
+            return
+        for event in iter_stream_events(response, entry.job.trace):
+            if entry.cancelled:
+                break
+            if event[0] == 'usage':
+                ratelimit.spend(prefs, event[1], prefs.fim_url)
+                prompt_tokens, completion_tokens, _, _ = usage.normalize(event[1])
+                spent = prompt_tokens + completion_tokens
+            entry.add(event)
+            recorder.record(event)
+    except Exception as e:
+        entry.add(('error', f"Connection error: {str(e)}"))
+    finally:
+        if entry.cancelled:
+            entry.job.cancel()
+        if spent is None:
+            # No usage reported: the prompt estimate plus what streamed
+            chars = sum(len(data) for kind, data in entry.events if kind == 'content')
+            spent = ratelimit.estimate_tokens(payload) + chars // CHARS_PER_TOKEN
+        # The reservation was the most it could cost
+        stats["spent"] += min(spent, entry.reserved) - entry.reserved
+
+
+def claim(key, job):
+    """Hand the prefetch for key over to job; False if there is none to use.
+
+    Events that already arrived are queued on job right away, the rest as
+    they stream in.
+    """
+    with _lock:
+        entry = _entries.pop(key, None)
+    if entry is None:
+        return False
+    with entry.lock:
+        if entry.failed or entry.job.cancelled:
+            return False
+        for event in entry.events:
+            job.trace.observe(event)
+            job.put(event)
+        if not entry.done:
+            entry.subscriber = job
+        # A finished prefetch replays like a cached answer
+        job.trace.cached = entry.done
+    stats["used"] += 1
+    print(f"[DeepSeek] Using a prefetched completion ({'done' if entry.done else 'streaming'})")
+    return True
+
+
+def _visible_texts():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'TEXT_EDITOR':
+                text = area.spaces.active.text
+                if text is not None:
+                    yield text
+
+
+def _cancel_streaming(text_name=None):
+    """Cancel unclaimed prefetches still streaming, for one Text block or all"""
+    with _lock:
+        stale = [entry for entry in _entries.values()
+                 if not entry.done and entry.subscriber is None
+                 and (text_name is None or entry.text_name == text_name)]
+        for entry in stale:
+            del _entries[entry.key]
+    for entry in stale:
+        entry.job.cancel()
+        stats["cancelled"] += 1
+
+
+def _start(text, prefs):
+    with _lock:
+        if any(not entry.done and entry.subscriber is None for entry in _entries.values()):
+            return
+    if jobs.running():
+        # Low priority: never competes with a request the user is waiting for
+        return
+
+    prefix, suffix = fim_context(text, prefs.max_context_tokens)
+    if not prefix.strip():
+        return
+    payload = prompts.fim_payload(prefs, prefix, suffix)
+    key = response_cache.request_key(payload)
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            return
+
+    reserved = ratelimit.estimate_tokens(payload) + payload["max_tokens"]
+    if stats["spent"] + reserved > prefs.prefetch_token_budget:
+        return
+    if not ratelimit.get_limiter(prefs, prefs.fim_url).ready(reserved):
+        return
+
+    entry = Prefetch(key, text.name_full, reserved)
+    stats["spent"] += reserved
+    stats["started"] += 1
+    evicted = []
+    with _lock:
+        _entries[key] = entry
+        while len(_entries) > PREFETCH_CACHE_SIZE:
+            evicted.append(_entries.popitem(last=False)[1])
+    for old in evicted:
+        if old.subscriber is None:
+            old.job.cancel()
+    recorder = response_cache.CacheRecorder(response_cache.get_cache(prefs, payload), key)
+    workers.submit(_stream, entry, prefs, payload, recorder)
+
+
+def _poll():
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon is None or not addon.preferences.prefetch:
+        if _watched:
+            _watched.clear()
+            _cancel_streaming()
+        return PREFETCH_POLL_INTERVAL
+
+    _watch(_visible_texts(), addon.preferences)
+    return PREFETCH_POLL_INTERVAL
+
+
+def _watch(texts, prefs):
+    """Notice typing and pauses in texts; prefetch for a Text block idle long enough"""
+    now = time.perf_counter()
+    seen = set()
+    for text in texts:
+        name = text.name_full
+        if name in seen:
+            continue
+        seen.add(name)
+        signature = project_index.text_signal(text)
+        state = _watched.get(name)
+        if state is None or state[0] != signature:
+            # Typing or moving the cursor makes a streaming prefetch useless
+            _cancel_streaming(name)
+            _watched[name] = [signature, now, False]
+        elif not state[2] and now - state[1] >= prefs.prefetch_idle_ms / 1000.0:
+            # One try per pause
+            state[2] = True
+            _start(text, prefs)
+
+    for name in list(_watched):
+        if name not in seen:
+            del _watched[name]
+
+
+def register():
+    bpy.app.timers.register(_poll, first_interval=PREFETCH_POLL_INTERVAL, persistent=True)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
+    _watched.clear()
+    _cancel_streaming()
+    with _lock:
+        _entries.clear()
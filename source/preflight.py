@@ -0,0 +1,301 @@
+import ast
+import builtins
+import io
+import sys
+import textwrap
+import time
+import traceback
+
+import bpy
+
+# Names the Fix Errors namespace provides besides the builtins
+_PROVIDED_NAMES = set(dir(builtins)) | {'bpy'}
+
+
+class Problem:
+    """A static finding, reported like the exception it would raise"""
+    __slots__ = ("line", "message")
+
+    def __init__(self, line, message):
+        self.line = line
+        self.message = message
+
+
+class ExecutionBudgetExceeded(BaseException):
+    """Raised inside the script when it runs past its time budget.
+
+    Derives from BaseException so ``except Exception`` in the script
+    does not swallow it.
+    """
+
+
+def _dotted(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return parts[::-1]
+
+
+class _Analyzer:
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.bound = set()
+        self.star_import = False
+        self.aliases = {'bpy': 'bpy'}
+        self.script_types = set()
+        self.script_ops = set()
+        self.script_attrs = set()
+        self.problems = []
+        # dir() of bpy.ops walks every registered operator, so it runs once per analysis
+        self._op_modules = None
+        self._ops = {}
+
+    def collect(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+                self.bound.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.bound.add(node.name)
+            elif isinstance(node, ast.ClassDef):
+                self.bound.add(node.name)
+                self.script_types.add(node.name)
+                self._collect_idname(node)
+            elif isinstance(node, ast.arg):
+                self.bound.add(node.arg)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    name = alias.asname or alias.name.split('.')[0]
+                    self.bound.add(name)
+                    self.aliases[name] = alias.name if alias.asname else name
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    if alias.name == '*':
+                        self.star_import = True
+                        continue
+                    self.bound.add(alias.asname or alias.name)
+                    if node.module and node.module.split('.')[0] == 'bpy' and not node.level:
+                        self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                self.bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                self.bound.update(node.names)
+            elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+                self.bound.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                self.bound.add(node.rest)
+            elif isinstance(node, ast.Attribute) and not isinstance(node.ctx, ast.Load):
+                # Properties the script registers, e.g. bpy.types.Scene.my_prop = ...
+                self.script_attrs.add(node.attr)
+
+    def _collect_idname(self, node):
+        for statement in node.body:
+            if (isinstance(statement, ast.Assign)
+                    and any(isinstance(t, ast.Name) and t.id == 'bl_idname' for t in statement.targets)
+                    and isinstance(statement.value, ast.Constant) and isinstance(statement.value.value, str)):
+                self.script_ops.add(statement.value.value)
+
+    def check_names(self):
+        if self.star_import:
+            return
+        reported = set()
+        for node in ast.walk(self.tree):
+            if (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+                    and node.id not in self.bound and node.id not in _PROVIDED_NAMES
+                    and node.id not in reported):
+                reported.add(node.id)
+                self.problems.append(Problem(node.lineno, f"NameError: name '{node.id}' is not defined"))
+
+    def _expand(self, parts):
+        target = self.aliases.get(parts[0])
+        if target is None or target.split('.')[0] != 'bpy':
+            return None
+        return target.split('.') + parts[1:]
+
+    def check_api(self):
+        inner = set()
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Attribute):
+                inner.add(id(node.value))
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.ImportFrom) and node.module in ('bpy.types', 'bpy.ops') and not node.level:
+                for alias in node.names:
+                    if alias.name != '*':
+                        self._check_path(node.module.split('.') + [alias.name], node.lineno)
+            elif isinstance(node, ast.Attribute) and id(node) not in inner:
+                parts = _dotted(node)
+                path = self._expand(parts) if parts else None
+                if path is None:
+                    continue
+                if not isinstance(node.ctx, ast.Load):
+                    path = path[:-1]
+                self._check_path(path, node.lineno)
+            elif isinstance(node, ast.Call) and node.keywords:
+                parts = _dotted(node.func)
+                path = self._expand(parts) if parts else None
+                if path and len(path) == 4 and path[1] == 'ops':
+                    self._check_operator_keywords(path, node)
+
+    def _check_path(self, path, line):
+        if len(path) < 2:
+            return
+        name = path[1]
+        if not hasattr(bpy, name):
+            self.problems.append(Problem(line, f"AttributeError: module 'bpy' has no attribute '{name}'"))
+        elif name == 'ops' and len(path) > 2:
+            self._check_operator(path, line)
+        elif name == 'types' and len(path) > 2:
+            self._check_type(path, line)
+        elif name == 'data' and len(path) > 2 and not hasattr(bpy.data, path[2]):
+            self.problems.append(Problem(line, f"AttributeError: 'BlendData' object has no attribute '{path[2]}'"))
+
+    def _operator_modules(self):
+        if self._op_modules is None:
+            self._op_modules = set(dir(bpy.ops))
+        return self._op_modules
+
+    def _operators(self, module):
+        names = self._ops.get(module)
+        if names is None:
+            names = self._ops[module] = set(dir(getattr(bpy.ops, module)))
+        return names
+
+    def _check_operator(self, path, line):
+        module = path[2]
+        if module not in self._operator_modules():
+            if not any(idname.split('.')[0] == module for idname in self.script_ops):
+                self.problems.append(Problem(line, f"AttributeError: bpy.ops has no operator module '{module}'"))
+            return
+        if len(path) > 3 and path[3] not in self._operators(module):
+            if f"{module}.{path[3]}" not in self.script_ops:
+                self.problems.append(Problem(line, f"AttributeError: unknown operator bpy.ops.{module}.{path[3]}"))
+
+    def _check_type(self, path, line):
+        name = path[2]
+        cls = getattr(bpy.types, name, None)
+        if cls is None:
+            if name not in self.script_types:
+                self.problems.append(Problem(line, f"AttributeError: module 'bpy.types' has no attribute '{name}'"))
+            return
+        if len(path) > 3:
+            attr = path[3]
+            rna = getattr(cls, 'bl_rna', None)
+            known = hasattr(cls, attr) or attr in self.script_attrs
+            if rna is not None:
+                known = known or attr in rna.properties or attr in rna.functions
+            if not known:
+                self.problems.append(Problem(line, f"AttributeError: '{name}' has no attribute '{attr}'"))
+
+    def _check_operator_keywords(self, path, node):
+        module, op = path[2], path[3]
+        if module not in self._operator_modules() or op not in self._operators(module):
+            return
+        try:
+            properties = getattr(getattr(bpy.ops, module), op).get_rna_type().properties
+        except KeyError:
+            return
+        for keyword in node.keywords:
+            if keyword.arg is not None and keyword.arg not in properties:
+                self.problems.append(Problem(
+                    node.lineno,
+                    f"TypeError: bpy.ops.{module}.{op}() got an unexpected keyword argument '{keyword.arg}'"))
+
+
+def analyze(code, filename="<string>"):
+    """Problems found without running code, in line order.
+
+    Syntax errors stop the analysis; otherwise names are resolved over
+    the whole module and ``bpy`` attribute paths, operator keywords
+    included, are checked against the live RNA definitions.
+    """
+    try:
+        tree = compile(code, filename, 'exec', ast.PyCF_ONLY_AST)
+        compile(tree, filename, 'exec')
+    except SyntaxError as e:
+        # Drop the 'File ..., line ...' header, format_problems adds its own
+        lines = ''.join(traceback.format_exception_only(e)).splitlines()[1:]
+        return [Problem(e.lineno or 1, textwrap.dedent('\n'.join(lines)))]
+    except ValueError as e:
+        return [Problem(1, f"ValueError: {e}")]
+
+    analyzer = _Analyzer(tree)
+    analyzer.collect()
+    analyzer.check_names()
+    analyzer.check_api()
+    return sorted(analyzer.problems, key=lambda problem: problem.line)
+
+
+def format_problems(problems, filename):
+    """Console-style report of the problems, in place of a traceback"""
+    out = [f"Static analysis found {len(problems)} problem(s):"]
+    for problem in problems:
+        out.append(f'  File "{filename}", line {problem.line}')
+        out.extend("    " + line for line in problem.message.splitlines())
+    return '\n'.join(out) + '\n'
+
+
+def run_with_budget(compiled, namespace, budget):
+    """exec compiled within budget seconds.
+
+    A trace function checks the clock on every call and, inside the
+    script's own frames, on every line, raising ExecutionBudgetExceeded
+    once the budget is spent. Long calls into C (bakes, modifiers) are
+    only interrupted when they return.
+    """
+    deadline = time.perf_counter() + budget
+    filename = compiled.co_filename
+
+    def trace(frame, event, arg):
+        if time.perf_counter() > deadline:
+            raise ExecutionBudgetExceeded(f"Script still running after {budget:g}s")
+        return trace if frame.f_code.co_filename == filename else None
+
+    previous = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        exec(compiled, namespace)
+    finally:
+        sys.settrace(previous)
+
+
+def find_errors(code, filename, execute=False, budget=0.0):
+    """Error report for code as (error_data, note).
+
+    error_data is None when nothing was found; note explains a run that
+    was stopped by its budget. The script is only executed when the
+    static checks pass and ``execute`` is set.
+    """
+    problems = analyze(code, filename)
+    if problems:
+        return {
+            "message": problems[0].message.splitlines()[-1],
+            "traceback": format_problems(problems, filename),
+            "code": code
+        }, None
+    if not execute:
+        return None, None
+
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    output_buffer = io.StringIO()
+    sys.stdout = sys.stderr = output_buffer
+    try:
+        namespace = {'__name__': '__main__', 'bpy': bpy}
+        run_with_budget(compile(code, filename, 'exec'), namespace, budget)
+        return None, None
+    except ExecutionBudgetExceeded as e:
+        # Not an error in the script; there is nothing to send
+        return None, f"{e}, stopped without finding errors"
+    except Exception as e:
+        traceback.print_exc(file=output_buffer)
+        return {
+            "message": str(e),
+            "traceback": output_buffer.getvalue(),
+            "code": code
+        }, None
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+        output_buffer.close()
@@ -0,0 +1,384 @@
+"""Functions and classes defined across the project, for prompts.
+
+Every Text block of the .blend file and the .py files under the folders in
+the Module Paths preference are parsed into short definitions (signature
+plus the first docstring line) kept in memory by name. A timer checks a few
+Text blocks per tick, reading one only when its cursor or line count moved,
+and rescans the folders now and then; only sources whose content (or file
+mtime and size) changed are parsed again, on the worker pool. Requests then get the definitions of the names they use from
+the other sources, within a token budget.
+"""
+import ast
+import builtins
+import keyword
+import os
+import re
+import threading
+import time
+
+import bpy
+
+from . import workers
+from .config import (CHARS_PER_TOKEN, PROJECT_INDEX_INTERVAL, PROJECT_MAX_FILE_BYTES, PROJECT_MAX_FILES,
+                     PROJECT_MAX_SYMBOLS, PROJECT_RESCAN_INTERVAL, PROJECT_TEXTS_PER_TICK)
+
+_DESCRIPTION_CHARS = 80
+_ARGUMENT_CHARS = 160
+# Public methods listed under a class
+_CLASS_MEMBERS = 12
+# Definitions with the same name in different sources
+_MAX_OWNERS = 2
+
+_IDENT_RE = re.compile(r'[A-Za-z_]\w*')
+_IGNORED = set(keyword.kwlist) | set(dir(builtins)) | {'self', 'cls', 'bpy', 'main', 'register', 'unregister'}
+_SKIPPED_DIRS = {'__pycache__', 'site-packages', 'node_modules'}
+
+# Sources parsed, and parses that hit a syntax error
+stats = {"parsed": 0, "failed": 0}
+
+
+def _describe(node):
+    doc = ast.get_docstring(node)
+    if not doc:
+        return ""
+    text = doc.strip().split('\n', 1)[0]
+    if len(text) > _DESCRIPTION_CHARS:
+        text = text[:_DESCRIPTION_CHARS - 3] + "..."
+    return f"  # {text}"
+
+
+def _function(node, indent=""):
+    arguments = ast.unparse(node.args)
+    if len(arguments) > _ARGUMENT_CHARS:
+        arguments = arguments[:_ARGUMENT_CHARS - 3] + "..."
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{indent}{prefix} {node.name}({arguments}){returns}: ...{_describe(node)}"
+
+
+def _class(node):
+    bases = ', '.join(ast.unparse(base) for base in node.bases)
+    lines = [f"class {node.name}({bases}):{_describe(node)}" if bases else f"class {node.name}:{_describe(node)}"]
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if child.name.startswith('_') and child.name != '__init__':
+                continue
+            if len(lines) > _CLASS_MEMBERS:
+                lines.append("    ...")
+                break
+            lines.append(_function(child, "    "))
+    if len(lines) == 1:
+        lines[0] += " ..."
+    return '\n'.join(lines)
+
+
+def extract_definitions(source):
+    """{name: definition} for the top-level functions and classes of source.
+
+    Raises SyntaxError when source does not parse.
+    """
+    definitions = {}
+    for node in ast.parse(source).body:
+        if len(definitions) >= PROJECT_MAX_SYMBOLS:
+            break
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            definitions[node.name] = _function(node)
+        elif isinstance(node, ast.ClassDef):
+            definitions[node.name] = _class(node)
+    return definitions
+
+
+class ProjectIndex:
+    """Definitions per source, plus which sources define each name.
+
+    A source is a Text block ("Text:<name>") or a module file ("File:<path>"). Updates come
+    from worker threads, lookups from the main thread.
+    """
+
+    def __init__(self):
+        # Source -> (version, title, {name: definition})
+        self.sources = {}
+        # Name -> sources defining it
+        self.names = {}
+        self.lock = threading.Lock()
+
+    def version(self, source):
+        with self.lock:
+            entry = self.sources.get(source)
+            return entry[0] if entry else None
+
+    def update(self, source, version, title, definitions):
+        with self.lock:
+            self._drop(source)
+            self.sources[source] = (version, title, definitions)
+            for name in definitions:
+                self.names.setdefault(name, []).append(source)
+
+    def touch(self, source, version, title):
+        """Record version without changing the definitions, for sources that did not parse"""
+        with self.lock:
+            entry = self.sources.get(source)
+            self.sources[source] = (version, title, entry[2] if entry else {})
+
+    def remove(self, source):
+        with self.lock:
+            self._drop(source)
+
+    def _drop(self, source):
+        entry = self.sources.pop(source, None)
+        if entry is None:
+            return
+        for name in entry[2]:
+            owners = self.names.get(name)
+            if owners is not None:
+                owners.remove(source)
+                if not owners:
+                    del self.names[name]
+
+    def prune(self, keep, prefix):
+        """Drop the sources starting with prefix that are not in keep"""
+        with self.lock:
+            for source in [s for s in self.sources if s.startswith(prefix) and s not in keep]:
+                self._drop(source)
+
+    def lookup(self, name, excluded=()):
+        """(title, definition) of name in up to _MAX_OWNERS sources"""
+        with self.lock:
+            found = []
+            for source in self.names.get(name, ()):
+                if source in excluded:
+                    continue
+                _, title, definitions = self.sources[source]
+                found.append((title, definitions[name]))
+                if len(found) >= _MAX_OWNERS:
+                    break
+            return found
+
+    def counts(self):
+        with self.lock:
+            return len(self.sources), sum(len(entry[2]) for entry in self.sources.values())
+
+    def clear(self):
+        with self.lock:
+            self.sources.clear()
+            self.names.clear()
+
+
+_index = ProjectIndex()
+# Sources handed to the worker pool and not parsed yet
+_pending = set()
+_pending_lock = threading.Lock()
+_state = {"cursor": 0, "scanned": 0.0, "scanning": False}
+# Text source -> text_signal() when it was last read
+_signals = {}
+
+
+def text_source(text):
+    return f"Text:{text.name_full}"
+
+
+def _parse(source, version, title, code):
+    """Worker: parse one source into the index"""
+    try:
+        definitions = extract_definitions(code)
+    except (SyntaxError, ValueError):
+        # Usually a script being typed in; its last good definitions stay
+        stats["failed"] += 1
+        _index.touch(source, version, title)
+    else:
+        stats["parsed"] += 1
+        _index.update(source, version, title, definitions)
+    finally:
+        with _pending_lock:
+            _pending.discard(source)
+
+
+def _queue(source, version, title, code, wait):
+    """Parse source now or on the worker pool; False if it is already being parsed"""
+    with _pending_lock:
+        if source in _pending:
+            return False
+        _pending.add(source)
+    if wait:
+        _parse(source, version, title, code)
+    else:
+        workers.submit(_parse, source, version, title, code)
+    return True
+
+
+def text_signal(text):
+    """Cheap to read and changes with almost every edit, unlike reading the whole text"""
+    return text.is_dirty, len(text.lines), text.current_line_index, text.current_character
+
+
+def _check_text(text, wait=False):
+    source = text_source(text)
+    if not wait:
+        signal = text_signal(text)
+        if _signals.get(source) == signal:
+            return
+    code = text.as_string()
+    if len(code) > PROJECT_MAX_FILE_BYTES:
+        _index.remove(source)
+    else:
+        version = hash(code)
+        if _index.version(source) != version and not _queue(source, version, text.name_full, code, wait):
+            # Still parsing an older version: look again next time
+            return
+    if not wait:
+        _signals[source] = signal
+
+
+def update_texts(limit=None, wait=False):
+    """Re-index the Text blocks that changed, at most limit of them per call.
+
+    Successive calls go round all Text blocks, so the cost per call stays
+    bounded however many there are; a block is only read again when its
+    cursor, line count or dirty flag moved. With wait, every block is read
+    and parsing happens right away instead of on the worker pool.
+    """
+    texts = bpy.data.texts
+    keep = {text_source(text) for text in texts}
+    _index.prune(keep, "Text:")
+    for source in [s for s in _signals if s not in keep]:
+        del _signals[source]
+    count = len(texts)
+    if not count:
+        return
+    for _ in range(count if limit is None else min(limit, count)):
+        _state["cursor"] %= count
+        _check_text(texts[_state["cursor"]], wait)
+        _state["cursor"] += 1
+
+
+def module_paths(prefs):
+    """Absolute folders (or files) from the Module Paths preference"""
+    return [bpy.path.abspath(path.strip()) for path in prefs.project_module_paths.split(';') if path.strip()]
+
+
+def _module_files(paths):
+    files = []
+    for root in paths:
+        if os.path.isfile(root):
+            files.append((root, os.path.basename(root)))
+            continue
+        for folder, dirs, names in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in _SKIPPED_DIRS)
+            for name in sorted(names):
+                if name.endswith('.py'):
+                    path = os.path.join(folder, name)
+                    files.append((path, os.path.relpath(path, root)))
+                    if len(files) >= PROJECT_MAX_FILES:
+                        return files
+    return files
+
+
+def scan_files(paths):
+    """Re-index the module files under paths whose mtime or size changed; blocks"""
+    try:
+        keep = set()
+        for path, title in _module_files(paths):
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            if info.st_size > PROJECT_MAX_FILE_BYTES:
+                continue
+            source = f"File:{path}"
+            keep.add(source)
+            version = (info.st_mtime_ns, info.st_size)
+            if _index.version(source) == version:
+                continue
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    code = f.read()
+            except OSError:
+                continue
+            _queue(source, version, title.replace(os.sep, '/'), code, True)
+        _index.prune(keep, "File:")
+    finally:
+        _state["scanning"] = False
+
+
+def update_all(prefs):
+    """Index every Text block and module file now, for batch runs and scripts"""
+    update_texts(wait=True)
+    scan_files(module_paths(prefs))
+
+
+def _excluded(text):
+    """Sources that are the Text block itself: its definitions are already in the prompt"""
+    if text is None:
+        return ()
+    excluded = {text_source(text)}
+    if text.filepath:
+        excluded.add(f"File:{bpy.path.abspath(text.filepath)}")
+    return excluded
+
+
+def project_context(code, max_tokens, text=None):
+    """Definitions from other Text blocks and module files of the names in code, within max_tokens.
+
+    Names nearest the end of code are looked up first; text, the block
+    code comes from, is left out.
+    """
+    if max_tokens <= 0:
+        return ""
+    budget = max_tokens * CHARS_PER_TOKEN
+    used = 0
+    excluded = _excluded(text)
+    # Title -> definitions, grouped under one header per source
+    groups = {}
+    seen = set()
+    for name in reversed(_IDENT_RE.findall(code)):
+        if name in seen or name in _IGNORED:
+            continue
+        seen.add(name)
+        for title, definition in _index.lookup(name, excluded):
+            if any(definition in definitions for definitions in groups.values()):
+                # A Text block loaded from a module file
+                continue
+            size = len(definition) + 1 + (0 if title in groups else len(title) + 3)
+            if used + size > budget:
+                return _format(groups)
+            groups.setdefault(title, []).append(definition)
+            used += size
+    return _format(groups)
+
+
+def _format(groups):
+    return '\n'.join(f"# {title}\n" + '\n'.join(definitions) for title, definitions in groups.items())
+
+
+def counts():
+    """(sources, definitions) in the index"""
+    return _index.counts()
+
+
+def _tick():
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon is None or addon.preferences.project_context_tokens == 0:
+        return PROJECT_INDEX_INTERVAL
+    prefs = addon.preferences
+    update_texts(PROJECT_TEXTS_PER_TICK)
+    now = time.monotonic()
+    if not _state["scanning"] and now - _state["scanned"] >= PROJECT_RESCAN_INTERVAL:
+        _state["scanned"] = now
+        _state["scanning"] = True
+        # Walking the folders and reading files stays off the main thread
+        workers.submit(scan_files, module_paths(prefs))
+    return PROJECT_INDEX_INTERVAL
+
+
+def register():
+    bpy.app.timers.register(_tick, first_interval=PROJECT_INDEX_INTERVAL, persistent=True)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(_tick):
+        bpy.app.timers.unregister(_tick)
+    _index.clear()
+    with _pending_lock:
+        _pending.clear()
+    _signals.clear()
+    _state.update(cursor=0, scanned=0.0, scanning=False)
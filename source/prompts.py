@@ -0,0 +1,111 @@
+from . import api_index, patching, project_index
+
+
+def api_reference(api_context):
+    """Prompt section with the bpy signatures retrieved for a request"""
+    if not api_context:
+        return ""
+    return f"Relevant Blender Python API:\n'''\n{api_context}\n'''\n\n"
+
+
+def project_reference(project_context):
+    """Prompt section with the definitions retrieved from the rest of the project"""
+    if not project_context:
+        return ""
+    return f"Definitions from other scripts of the project:\n'''\n{project_context}\n'''\n\n"
+
+
+def build_messages(prefs, code_context, scene_context, api_context="", project_context="", session=None):
+    """Chat messages for autocomplete, ordered for provider-side prefix caching.
+
+    The instructions and the scene summary rarely change between requests,
+    so they form a fixed system prefix; the API signatures, project
+    definitions and the code around the cursor change on every request and
+    go last. The earlier turns of session go in between; new turns are
+    only ever appended, until the session is compacted.
+    """
+    system = prefs.system_prompt
+    # Older custom prompts place the scene themselves
+    if "{scene_context}" not in prefs.custom_prompt:
+        system += f"\nCurrent scene:\n'''\n{scene_context}\n'''\n"
+    history = []
+    if session is not None:
+        system += session.summary_section()
+        history = session.history()
+    return [
+        {"role": "system", "content": system},
+        *history,
+        {"role": "user", "content": api_reference(api_context) + project_reference(project_context) + prefs.custom_prompt.format(
+            code_context=code_context,
+            scene_context=scene_context
+        )},
+    ]
+
+
+def autocomplete_payload(prefs, messages):
+    return {
+        "model": prefs.model_name,
+        "messages": messages,
+        "max_tokens": prefs.max_tokens,
+        "temperature": prefs.temperature,
+        "top_p": prefs.top_p,
+        "frequency_penalty": prefs.frequency_penalty,
+        "presence_penalty": prefs.presence_penalty,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+
+
+def fim_payload(prefs, prefix, suffix):
+    """Fill-in-the-middle request: a short completion between prefix and suffix"""
+    return {
+        "model": prefs.model_name,
+        "prompt": prefix,
+        "suffix": suffix,
+        "max_tokens": prefs.fim_max_tokens,
+        "temperature": prefs.temperature,
+        "top_p": prefs.top_p,
+        # Stop at the end of the statement or block being written
+        "stop": ["\n\n"],
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+
+
+def fix_payload(prefs, error_data, mode, text=None):
+    """Request for a corrected file (FULL) or a unified diff against it (PATCH).
+
+    text is the Text block being fixed, left out of the project definitions.
+    """
+    if mode == 'PATCH':
+        prompt = prefs.error_diff_prompt.format(
+            code=patching.number_lines(error_data["code"]),
+            error=error_data["message"],
+            console_output=error_data["traceback"]
+        )
+    else:
+        prompt = prefs.error_prompt.format(
+            code=error_data["code"],
+            error=error_data["message"],
+            console_output=error_data["traceback"]
+        )
+    # Real signatures for the (possibly misspelled) APIs named in the error
+    api_context = api_index.api_context(
+        error_data["message"] + '\n' + error_data["traceback"],
+        prefs.api_context_tokens, fuzzy=True)
+    prompt += api_reference(api_context)
+    # Helpers from other scripts, names in the error first
+    project_context = project_index.project_context(
+        error_data["code"] + '\n' + error_data["message"] + '\n' + error_data["traceback"],
+        prefs.project_context_tokens, text)
+    prompt += project_reference(project_context)
+    return {
+        "model": prefs.model_name_fix_errors,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": prefs.temperature,
+        "top_p": prefs.top_p,
+        "frequency_penalty": prefs.frequency_penalty,
+        "presence_penalty": prefs.presence_penalty,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
@@ -28,6 +28,62 @@ class DeepSeekProperties:
         description="AI model to use for error correction",
         default=DEFAULT_MODEL_FIX_ERRORS
     )
+
+    fim_url: bpy.props.StringProperty(
+        name="Fill-in-the-Middle URL",
+        description="Completions endpoint with prompt/suffix support used to complete at the cursor "
+                    "(DeepSeek's beta completions or a local server)",
+        default=DEFAULT_FIM_URL
+    )
+    
+    connect_timeout: bpy.props.FloatProperty(
+        name="Connect Timeout (s)",
+        description="Seconds to wait for the connection to the API",
+        default=DEFAULT_CONNECT_TIMEOUT,
+        min=1.0,
+        max=60.0
+    )
+
+    read_timeout: bpy.props.FloatProperty(
+        name="Read Timeout (s)",
+        description="Seconds to wait for data from the API before giving up",
+        default=DEFAULT_READ_TIMEOUT,
+        min=5.0,
+        max=600.0
+    )
+
+    pool_size: bpy.props.IntProperty(
+        name="Connection Pool Size",
+        description="Keep-alive connections kept open per API host",
+        default=DEFAULT_POOL_SIZE,
+        min=1,
+        max=16
+    )
+
+    rate_limit_rpm: bpy.props.IntProperty(
+        name="Requests per Minute",
+        description="Requests sent per minute at most; extra requests wait their turn (0 = no limit)",
+        default=DEFAULT_RATE_LIMIT_RPM,
+        min=0,
+        max=10000
+    )
+
+    rate_limit_tpm: bpy.props.IntProperty(
+        name="Tokens per Minute",
+        description="Estimated prompt plus reported completion tokens per minute at most (0 = no limit)",
+        default=DEFAULT_RATE_LIMIT_TPM,
+        min=0,
+        max=10000000
+    )
+
+    max_retries: bpy.props.IntProperty(
+        name="Max Retries",
+        description="Retries after a rate limit (429), server error (5xx) or failed connection, "
+                    "waiting as long as the API asks or with a growing random backoff",
+        default=DEFAULT_MAX_RETRIES,
+        min=0,
+        max=10
+    )
     
     max_tokens: bpy.props.IntProperty(
         name="Max Tokens",
@@ -37,6 +93,14 @@ class DeepSeekProperties:
         max=8000
     )
     
+    fim_max_tokens: bpy.props.IntProperty(
+        name="Cursor Completion Tokens",
+        description="Maximum length of a completion at the cursor; small values answer fastest",
+        default=DEFAULT_FIM_MAX_TOKENS,
+        min=8,
+        max=1024
+    )
+
     temperature: bpy.props.FloatProperty(
         name="Temperature",
         description="Controls randomness (0.0 = deterministic, 1.0 = creative)",
@@ -73,9 +137,65 @@ class DeepSeekProperties:
         step=0.1
     )
     
+    max_context_tokens: bpy.props.IntProperty(
+        name="Max Context Tokens",
+        description="Approximate token budget for the code sent as context with autocomplete",
+        default=DEFAULT_MAX_CONTEXT_TOKENS,
+        min=256,
+        max=64000
+    )
+    
+    api_context_tokens: bpy.props.IntProperty(
+        name="API Reference Tokens",
+        description="Approximate tokens of bpy API signatures added for the names near the cursor "
+                    "or in the error (0 disables)",
+        default=DEFAULT_API_CONTEXT_TOKENS,
+        min=0,
+        max=4000
+    )
+
+    project_context_tokens: bpy.props.IntProperty(
+        name="Project Reference Tokens",
+        description="Approximate tokens of functions and classes from other Text blocks and module files "
+                    "added for the names the code uses (0 disables)",
+        default=DEFAULT_PROJECT_CONTEXT_TOKENS,
+        min=0,
+        max=8000
+    )
+
+    project_module_paths: bpy.props.StringProperty(
+        name="Module Paths",
+        description="Folders or .py files whose definitions are indexed too, separated by ';' "
+                    "(// for paths relative to the .blend file)",
+        default=""
+    )
+
+    session_tokens: bpy.props.IntProperty(
+        name="Session Memory Tokens",
+        description="Approximate tokens of earlier autocomplete requests and answers on the same Text block "
+                    "sent with each request; older ones are summarised beyond this (0 disables)",
+        default=DEFAULT_SESSION_TOKENS,
+        min=0,
+        max=64000
+    )
+
+    scene_max_listed: bpy.props.IntProperty(
+        name="Max Listed Scene Items",
+        description="Maximum objects/collections listed per category in the scene summary",
+        default=DEFAULT_SCENE_MAX_LISTED,
+        min=0,
+        max=1000
+    )
+    
+    system_prompt: bpy.props.StringProperty(
+        name="System Prompt",
+        description="Fixed instructions sent first, followed by the scene summary, so the provider can cache them",
+        default=DEFAULT_SYSTEM_PROMPT,
+    )
+    
     custom_prompt: bpy.props.StringProperty(
         name="Custom Prompt",
-        description="Prompt template (use {code_context} for existing code)",
+        description="Prompt template sent last (use {code_context} for existing code)",
         default=DEFAULT_PROMPT,
     )
     
@@ -83,4 +203,152 @@ class DeepSeekProperties:
         name="Error Prompt",
         description="Prompt template for error correction (use {code}, {error}, {console_output})",
         default=DEFAULT_ERROR_PROMPT,
-    )
\ No newline at end of file
+    )
+
+    fix_mode: bpy.props.EnumProperty(
+        name="Fix Mode",
+        description="How Fix Errors asks for and applies corrections",
+        items=[
+            ('PATCH', "Patch", "Ask for a unified diff and apply it in place, regenerating the file if it does not apply"),
+            ('FULL', "Full File", "Ask for the whole corrected file"),
+        ],
+        default='PATCH'
+    )
+
+    fix_execute: bpy.props.BoolProperty(
+        name="Run Script After Static Checks",
+        description="Also execute the script to find runtime errors when the static checks pass. "
+                    "Running the script changes the scene and blocks Blender while it runs",
+        default=False
+    )
+
+    fix_execute_budget: bpy.props.FloatProperty(
+        name="Execution Budget (s)",
+        description="Stop the script if it is still running after this many seconds",
+        default=DEFAULT_FIX_EXECUTE_BUDGET,
+        min=0.1,
+        max=600.0
+    )
+
+    error_diff_prompt: bpy.props.StringProperty(
+        name="Error Diff Prompt",
+        description="Prompt template for patch error correction (use {code}, {error}, {console_output})",
+        default=DEFAULT_ERROR_DIFF_PROMPT,
+    )
+
+    max_concurrent_jobs: bpy.props.IntProperty(
+        name="Max Concurrent Requests",
+        description="Requests allowed to run at the same time across all Text blocks",
+        default=DEFAULT_MAX_CONCURRENT_JOBS,
+        min=1,
+        max=32
+    )
+
+    debounce_ms: bpy.props.IntProperty(
+        name="Debounce (ms)",
+        description="Repeated shortcut presses on the same Text block within this time are ignored",
+        default=DEFAULT_DEBOUNCE_MS,
+        min=0,
+        max=5000
+    )
+
+    response_cache: bpy.props.EnumProperty(
+        name="Response Cache",
+        description="Reuse stored answers for identical requests",
+        items=[
+            ('OFF', "Off", "Always send requests to the API"),
+            ('DETERMINISTIC', "Deterministic Only", "Cache requests sent with temperature 0"),
+            ('ALWAYS', "Always", "Cache every request, even with random sampling"),
+        ],
+        default='DETERMINISTIC'
+    )
+
+    response_cache_size_mb: bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently used answers are evicted above this size",
+        default=DEFAULT_RESPONSE_CACHE_SIZE_MB,
+        min=1,
+        max=4096
+    )
+
+    response_cache_max_age_days: bpy.props.IntProperty(
+        name="Cache Max Age (days)",
+        description="Answers older than this are not reused",
+        default=DEFAULT_RESPONSE_CACHE_MAX_AGE_DAYS,
+        min=1,
+        max=365
+    )
+
+    hedge_mode: bpy.props.EnumProperty(
+        name="Hedging",
+        description="Send extra identical requests to cut slow responses and keep the first answer that compiles",
+        items=[
+            ('OFF', "Off", "Send a single request"),
+            ('HEDGE', "Hedge Slow Requests", "Send a second request when no token arrived by the p95 time to first token"),
+            ('CANDIDATES', "Parallel Candidates", "Send several requests at once"),
+        ],
+        default='OFF'
+    )
+
+    hedge_candidates: bpy.props.IntProperty(
+        name="Candidates",
+        description="Requests sent at once in Parallel Candidates mode",
+        default=DEFAULT_HEDGE_CANDIDATES,
+        min=2,
+        max=4
+    )
+
+    hedge_delay: bpy.props.FloatProperty(
+        name="Hedge Delay (s)",
+        description="Wait before hedging until enough requests were timed to use their p95",
+        default=DEFAULT_HEDGE_DELAY,
+        min=0.1,
+        max=60.0
+    )
+
+    hedge_token_budget: bpy.props.IntProperty(
+        name="Extra Token Budget",
+        description="Completion tokens extra requests may spend in this session",
+        default=DEFAULT_HEDGE_TOKEN_BUDGET,
+        min=0,
+        max=1000000
+    )
+
+    prefetch: bpy.props.BoolProperty(
+        name="Speculative Prefetch",
+        description="Request the completion at the cursor in the background when typing pauses, "
+                    "so Complete at Cursor can answer right away. Spends tokens on unused completions",
+        default=False
+    )
+
+    prefetch_idle_ms: bpy.props.IntProperty(
+        name="Prefetch After Idle (ms)",
+        description="How long typing must pause before the completion is requested",
+        default=DEFAULT_PREFETCH_IDLE_MS,
+        min=100,
+        max=10000
+    )
+
+    prefetch_token_budget: bpy.props.IntProperty(
+        name="Prefetch Token Budget",
+        description="Prompt and completion tokens speculative requests may spend in this session",
+        default=DEFAULT_PREFETCH_TOKEN_BUDGET,
+        min=0,
+        max=10000000
+    )
+
+    frame_budget_ms: bpy.props.FloatProperty(
+        name="UI Frame Budget (ms)",
+        description="Maximum time per timer tick spent applying streamed output to the Text Editor",
+        default=DEFAULT_FRAME_BUDGET_MS,
+        min=0.5,
+        max=50.0,
+        step=50
+    )
+
+    trace_log_path: bpy.props.StringProperty(
+        name="Trace Log",
+        description="Append the latency trace of every request to this JSONL file (empty to disable)",
+        subtype='FILE_PATH',
+        default=""
+    )
@@ -0,0 +1,239 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import BACKOFF_BASE, BACKOFF_MAX, BREAKER_COOLDOWN, BREAKER_FAILURES, CHARS_PER_TOKEN, RATE_LIMIT_BURST
+
+# Statuses worth another try: quota exhausted or the provider overloaded
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_limiters = {}
+_breakers = {}
+_lock = threading.Lock()
+
+# Requests sent, retries, seconds spent waiting for the limits and requests refused by the breaker
+stats = {"requests": 0, "waited": 0.0, "retries": 0, "rejected": 0}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the endpoint is considered down"""
+
+
+class Cancelled(requests.exceptions.RequestException):
+    """The job was cancelled while its request waited"""
+
+
+class TokenBucket:
+    """Refills at ``per_minute`` units a minute, up to RATE_LIMIT_BURST seconds' worth.
+
+    Providers often enforce per-minute quotas over shorter windows, so a
+    full minute is never sent at once. Callers reserve units even when the
+    bucket runs short and wait out the returned delay; later callers queue
+    behind the debt, so requests go out in arrival order instead of racing
+    for the next free slot.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * RATE_LIMIT_BURST)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount units; returns the seconds until they are actually available.
+
+        A request larger than the whole bucket goes out once the bucket is
+        full and leaves the rest as debt, which the next callers wait out.
+        """
+        self._refill(now)
+        delay = max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+        self.level -= amount
+        return delay
+
+    def refund(self, amount, now):
+        """Give back amount units taken by reserve()"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets of one endpoint (0 = unlimited)"""
+
+    def __init__(self):
+        self.requests = None
+        self.tokens = None
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def configure(self, requests_per_minute, tokens_per_minute):
+        with self.lock:
+            if (self.requests.per_minute if self.requests else 0) != requests_per_minute:
+                self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+            if (self.tokens.per_minute if self.tokens else 0) != tokens_per_minute:
+                self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens):
+        """Reserve one request of about tokens tokens; returns the seconds to wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.paused_until - now)
+            if self.requests:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            return delay
+
+    def ready(self, tokens):
+        """True if a request of about tokens tokens could go out without waiting"""
+        with self.lock:
+            now = time.monotonic()
+            if self.paused_until > now:
+                return False
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket:
+                    bucket._refill(now)
+                    if bucket.level < min(amount, bucket.capacity):
+                        return False
+            return True
+
+    def refund(self, tokens):
+        """Give back a reservation that was never sent"""
+        with self.lock:
+            now = time.monotonic()
+            if self.requests:
+                self.requests.refund(1, now)
+            if self.tokens:
+                self.tokens.refund(tokens, now)
+
+    def spend(self, tokens):
+        """Charge tokens only known once the response is done"""
+        with self.lock:
+            if self.tokens and tokens > 0:
+                self.tokens.reserve(tokens, time.monotonic())
+
+    def pause(self, seconds):
+        """Hold every request to this endpoint back, as the provider asked in Retry-After"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Fails fast after BREAKER_FAILURES failures in a row.
+
+    After BREAKER_COOLDOWN seconds one request is let through as a probe;
+    it closes the circuit again if it succeeds and reopens it otherwise.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.opened = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError unless a request may be sent now; True for the probe"""
+        with self.lock:
+            if self.opened is None:
+                return False
+            remaining = self.opened + BREAKER_COOLDOWN - time.monotonic()
+            if remaining <= 0 and not self.probing:
+                self.probing = True
+                return True
+        stats["rejected"] += 1
+        if remaining > 0:
+            raise CircuitOpenError(f"API endpoint unavailable, not retrying for {remaining:.0f}s")
+        raise CircuitOpenError("API endpoint unavailable, waiting for a test request")
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+            self.probing = False
+
+    def failure(self):
+        """Count a failed request; True once the circuit is open"""
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= BREAKER_FAILURES:
+                if self.opened is None or self.probing:
+                    print(f"[DeepSeek] {self.failures} failed requests in a row, "
+                          f"pausing requests for {BREAKER_COOLDOWN:.0f}s")
+                self.opened = time.monotonic()
+                self.probing = False
+            return self.opened is not None
+
+    def release(self):
+        """Let another probe through when this one ended without an answer"""
+        with self.lock:
+            self.probing = False
+
+
+def get_limiter(prefs, url=None):
+    """The limiter shared by every request to url's host (the API URL's by default).
+
+    Its limits are updated to the current preferences on every call.
+    """
+    host = urlsplit(url or prefs.api_url).netloc
+    with _lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = RateLimiter()
+    limiter.configure(prefs.rate_limit_rpm, prefs.rate_limit_tpm)
+    return limiter
+
+
+def get_breaker(prefs, url=None):
+    host = urlsplit(url or prefs.api_url).netloc
+    with _lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker()
+        return breaker
+
+
+def spend(prefs, usage, url=None):
+    """Charge the completion tokens a finished request reported to the tokens/min budget"""
+    get_limiter(prefs, url).spend(usage.get("completion_tokens") or 0)
+
+
+def estimate_tokens(payload):
+    """Prompt tokens of payload, estimated from its characters"""
+    chars = sum(len(message.get("content") or "") for message in payload.get("messages", ()))
+    # Fill-in-the-middle requests send code instead of messages
+    chars += len(payload.get("prompt") or "") + len(payload.get("suffix") or "")
+    return max(1, chars // CHARS_PER_TOKEN)
+
+
+def retry_after(response):
+    """Seconds asked for in the Retry-After header, or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff before retry number attempt (0-based)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def clear():
+    with _lock:
+        _limiters.clear()
+        _breakers.clear()
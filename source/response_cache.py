@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import storage
+
+# Hit/miss counters for the current Blender session
+stats = {"hits": 0, "misses": 0}
+
+_CACHE_DIR = "response_cache"
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def request_key(payload):
+    """Hash of the normalized request: everything that shapes the answer"""
+    normalized = {
+        key: round(value, 4) if isinstance(value, float) else value
+        for key, value in payload.items()
+        if key != "stream"
+    }
+    blob = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Completed responses stored as one JSON file per request key.
+
+    Entries are evicted least-recently-used first once the directory grows
+    past ``max_bytes``, and dropped when older than ``max_age`` seconds.
+    """
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                st = os.stat(os.path.join(directory, name))
+                self._entries[name[:-5]] = [st.st_size, st.st_mtime, st.st_atime]
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key):
+        """Stored events for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.max_age:
+                self._remove(key)
+                return None
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    events = [tuple(event) for event in json.load(f)["events"]]
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                return None
+            entry[2] = time.time()
+            # The access time survives restarts, the modification time stays the creation time
+            try:
+                os.utime(self._path(key), (entry[2], entry[1]))
+            except OSError:
+                pass
+            return events
+
+    def discard(self, key):
+        """Drop the entry for key, for responses that turned out to be unusable"""
+        with self._lock:
+            self._remove(key)
+
+    def put(self, key, events):
+        data = json.dumps({"created": time.time(), "events": events}, ensure_ascii=False)
+        with self._lock:
+            path = self._path(key)
+            tmp = path + '.tmp'
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[DeepSeek] Could not write response cache: {e}")
+                return
+            now = time.time()
+            self._entries[key] = [len(data.encode('utf-8')), now, now]
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key, (size, created, used) in list(self._entries.items()):
+            if now - created > self.max_age:
+                self._remove(key)
+        total = sum(entry[0] for entry in self._entries.values())
+        for key in sorted(self._entries, key=lambda k: self._entries[k][2]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries[key][0]
+            self._remove(key)
+
+
+def get_cache(prefs, payload):
+    """The shared cache if prefs allow caching this payload, else None"""
+    global _cache
+    if prefs.response_cache == 'OFF':
+        return None
+    if prefs.response_cache == 'DETERMINISTIC' and payload.get("temperature", 1.0) > 0.0:
+        return None
+
+    max_bytes = prefs.response_cache_size_mb * 1024 * 1024
+    max_age = prefs.response_cache_max_age_days * 86400
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(storage.user_directory(_CACHE_DIR), max_bytes, max_age)
+        _cache.max_bytes = max_bytes
+        _cache.max_age = max_age
+        return _cache
+
+
+def lookup(cache, key):
+    events = cache.get(key)
+    stats["hits" if events is not None else "misses"] += 1
+    return events
+
+
+class CacheRecorder:
+    """Collects the streamed events of a request and stores them on 'done'"""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.events = []
+
+    def record(self, event):
+        if self.cache is None:
+            return
+        if event[0] in ('reasoning', 'content'):
+            self.events.append(event)
+        elif event[0] == 'done':
+            self.cache.put(self.key, self.events)
@@ -0,0 +1,199 @@
+import array
+from collections import Counter
+
+import bpy
+from bpy.app.handlers import persistent
+
+_LISTED_TYPES = ('CAMERA', 'LIGHT', 'MESH')
+_DETAIL_DATA = (bpy.types.Camera, bpy.types.Light)
+
+_snapshots = {}
+_type_names = {}
+
+
+def _object_type_names():
+    # foreach_get reads the enum as its integer value
+    if not _type_names:
+        for item in bpy.types.Object.bl_rna.properties['type'].enum_items:
+            _type_names[item.value] = item.identifier
+    return _type_names
+
+
+def _more(total, shown):
+    return f" (+{total - shown} more)" if total > shown else ""
+
+
+class SceneSnapshot:
+    """Cached summary of a scene's objects.
+
+    The summary is built in one pass, with object types bulk-read through
+    ``foreach_get``, and lists at most ``max_listed`` entries per category.
+    Its counts, object details and selection parts are each dropped by the
+    depsgraph handler only when an update can change them.
+    """
+
+    def __init__(self):
+        self.max_listed = -1
+        self.counts_text = None
+        self.details_text = None
+        self.selection_text = None
+        self.listed = set()
+
+    def invalidate_counts(self):
+        self.counts_text = None
+        self.details_text = None
+
+    def invalidate_details(self):
+        self.details_text = None
+
+    def invalidate_selection(self):
+        self.selection_text = None
+
+    def build(self, context, max_listed):
+        scene = context.scene
+        if max_listed != self.max_listed:
+            self.invalidate_counts()
+            self.invalidate_selection()
+        self.max_listed = max_listed
+
+        if self.selection_text is None:
+            selected = context.view_layer.objects.selected
+            shown = [obj.name for obj in selected[:max_listed]]
+            active = context.view_layer.objects.active
+            self.selection_text = '\n'.join([
+                f"\nSelected Objects: {len(selected)}",
+                f"Selected Objects: {shown}{_more(len(selected), len(shown))}",
+                f"Active Object: {active.name if active else None}",
+            ])
+
+        if self.counts_text is not None and self.details_text is not None:
+            return
+
+        objects = scene.objects
+        count = len(objects)
+        types = array.array('i', bytes(4 * count))
+        objects.foreach_get('type', types)
+        names = _object_type_names()
+        counts = Counter(types)
+
+        if self.counts_text is None:
+            by_type = sorted(((names.get(value, str(value)), n) for value, n in counts.items()),
+                             key=lambda item: -item[1])
+            collections = sorted(((c.name, len(c.objects)) for c in scene.collection.children_recursive),
+                                 key=lambda item: -item[1])
+            info = [f"Total Objects: {count}"]
+            info.append("Objects by Type: " + ", ".join(f"{name} {n}" for name, n in by_type))
+            info.append(f"\nCollections ({len(collections)}):")
+            for name, n in collections[:max_listed]:
+                info.append(f"- {name}: {n} objects")
+            if len(collections) > max_listed:
+                info.append(f"- ...{_more(len(collections), max_listed)}")
+            self.counts_text = '\n'.join(info)
+
+        if self.details_text is None:
+            self.details_text = self._build_details(objects, types, counts, names, max_listed)
+
+    def _build_details(self, objects, types, counts, names, max_listed):
+        values = {identifier: value for value, identifier in names.items()}
+        totals = {kind: counts.get(values.get(kind), 0) for kind in _LISTED_TYPES}
+        listed = {values.get(kind): [] for kind in _LISTED_TYPES}
+        missing = sum(min(totals[kind], max_listed) for kind in _LISTED_TYPES)
+
+        # Stop as soon as every category has its first max_listed objects
+        for obj, value in zip(objects, types):
+            if not missing:
+                break
+            bucket = listed.get(value)
+            if bucket is not None and len(bucket) < max_listed:
+                bucket.append(obj)
+                missing -= 1
+
+        self.listed = {obj.session_uid for bucket in listed.values() for obj in bucket}
+        info = []
+
+        cameras = listed[values.get('CAMERA')]
+        info.append(f"\nCameras ({totals['CAMERA']}):")
+        for obj in cameras:
+            cam = obj.data
+            info.append(f"- {obj.name}: {cam.type} "
+                        f"(Focal: {cam.lens}mm, "
+                        f"Clip: {cam.clip_start}-{cam.clip_end}m)")
+        if totals['CAMERA'] > len(cameras):
+            info.append(f"- ...{_more(totals['CAMERA'], len(cameras))}")
+
+        lights = listed[values.get('LIGHT')]
+        info.append(f"\nLights ({totals['LIGHT']}):")
+        for obj in lights:
+            light = obj.data
+            info.append(f"- {obj.name}: {light.type} "
+                        f"(Power: {light.energy}W, "
+                        f"Color: {tuple(round(c, 2) for c in light.color)})")
+        if totals['LIGHT'] > len(lights):
+            info.append(f"- ...{_more(totals['LIGHT'], len(lights))}")
+
+        meshes = listed[values.get('MESH')]
+        info.append(f"\nMeshes ({totals['MESH']}):")
+        for obj in meshes:
+            info.append(f"- {obj.name}")
+        if totals['MESH'] > len(meshes):
+            info.append(f"- ...{_more(totals['MESH'], len(meshes))}")
+
+        return '\n'.join(info)
+
+
+def get_scene_context(context, max_listed):
+    """Scene summary for the prompt, served from the snapshot cache"""
+    scene = context.scene
+    snapshot = _snapshots.get(scene.session_uid)
+    if snapshot is None:
+        snapshot = _snapshots[scene.session_uid] = SceneSnapshot()
+    snapshot.build(context, max_listed)
+
+    scene_info = [f"Blender Version: {bpy.app.version_string}"]
+    scene_info.append(f"\nScene Name: {scene.name}")
+    scene_info.append(snapshot.counts_text)
+    scene_info.append(snapshot.selection_text)
+    scene_info.append(snapshot.details_text)
+    scene_info.append("\nRender Settings:")
+    scene_info.append(f"- Engine: {scene.render.engine}")
+    return '\n'.join(scene_info)
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    snapshot = _snapshots.get(scene.session_uid)
+    if snapshot is None:
+        return
+    for update in depsgraph.updates:
+        datablock = update.id
+        if isinstance(datablock, bpy.types.Scene):
+            # Selection and active object changes are tagged on the scene
+            snapshot.invalidate_selection()
+        elif isinstance(datablock, bpy.types.Collection):
+            # Objects were linked, unlinked or moved between collections
+            snapshot.invalidate_counts()
+        elif isinstance(datablock, _DETAIL_DATA):
+            snapshot.invalidate_details()
+        elif isinstance(datablock, bpy.types.Object):
+            # Moving or editing objects does not change the summary,
+            # renaming or re-linking a listed one does
+            if update.is_updated_transform or update.is_updated_geometry:
+                continue
+            if datablock.original.session_uid in snapshot.listed:
+                snapshot.invalidate_details()
+
+
+@persistent
+def on_load_post(*args):
+    _snapshots.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+    bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    bpy.app.handlers.load_post.remove(on_load_post)
+    _snapshots.clear()
@@ -0,0 +1,63 @@
+import time
+from queue import Empty
+
+from .config import (
+    DEFAULT_FRAME_BUDGET_MS,
+    TIMER_FAST_INTERVAL,
+    TIMER_IDLE_INTERVAL,
+    TIMER_BACKOFF,
+)
+
+
+class ApplyScheduler:
+    """Frame-budgeted drain of a worker queue with an adaptive modal timer.
+
+    Each timer tick handles at most ``budget_ms`` worth of queued events so
+    the operator can coalesce them into a single Text update. The timer
+    polls at ``fast_interval`` while events keep arriving and backs off
+    towards ``idle_interval`` when the stream goes quiet.
+    """
+
+    def __init__(self, data_queue, budget_ms=DEFAULT_FRAME_BUDGET_MS,
+                 fast_interval=TIMER_FAST_INTERVAL, idle_interval=TIMER_IDLE_INTERVAL):
+        self.data_queue = data_queue
+        self.budget = budget_ms / 1000.0
+        self.fast_interval = fast_interval
+        self.idle_interval = idle_interval
+        self.interval = fast_interval
+        self.tick_start = 0.0
+        self._timer = None
+
+    def start(self, context):
+        self.interval = self.fast_interval
+        self._timer = context.window_manager.event_timer_add(self.interval, window=context.window)
+
+    def stop(self, context):
+        if self._timer:
+            context.window_manager.event_timer_remove(self._timer)
+        self._timer = None
+
+    def drain(self):
+        """Yield queued events until the queue is empty or the budget is spent"""
+        self.tick_start = time.perf_counter()
+        deadline = self.tick_start + self.budget
+        while True:
+            try:
+                yield self.data_queue.get_nowait()
+            except Empty:
+                return
+            if time.perf_counter() >= deadline:
+                return
+
+    def settle(self, context, active):
+        """Adapt the timer rate after a tick; active means events were handled"""
+        if active or not self.data_queue.empty():
+            interval = self.fast_interval
+        else:
+            interval = min(self.interval * TIMER_BACKOFF, self.idle_interval)
+
+        if interval != self.interval and self._timer:
+            wm = context.window_manager
+            wm.event_timer_remove(self._timer)
+            self._timer = wm.event_timer_add(interval, window=context.window)
+        self.interval = interval
@@ -0,0 +1,138 @@
+"""Conversation memory of autocomplete, one session per Text block.
+
+Every finished request is kept as a short user turn (the lines before the
+cursor, where the request usually is) and a one-line note of the answer:
+the answer itself was written into the Text block, so the code sent with
+the next request already contains it. The turns are sent
+between the system prompt and the new request, so follow-ups like "now
+also add a light" see what came before. Turns already sent never change,
+so each request starts with the same bytes as the one before and the
+provider's prompt cache keeps hitting. Once the turns outgrow the token
+budget the oldest ones are compacted into a list of earlier requests in
+the system message, down to half the budget, so compaction happens now and
+then instead of on every request.
+"""
+import threading
+from collections import OrderedDict
+
+from .code_context import AFTER_CURSOR_MARKER
+from .config import CHARS_PER_TOKEN, SESSION_MAX_SESSIONS, SESSION_REQUEST_LINES, SESSION_SUMMARY_ITEMS
+from .streaming import sanitize
+
+_SUMMARY_CHARS = 120
+
+# Turns kept and compactions since Blender started
+stats = {"turns": 0, "compactions": 0}
+
+# Text name -> Session, least recently used first
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+
+def request_excerpt(code_context):
+    """The last lines before the cursor: the comment or code the request was made at"""
+    before = code_context.split(AFTER_CURSOR_MARKER)[0]
+    lines = [line for line in before.rstrip().split('\n') if line.strip()]
+    return '\n'.join(lines[-SESSION_REQUEST_LINES:])
+
+
+def _user_message(request):
+    return f"Request at the end of the code:\n'''\n{request}\n'''"
+
+
+def _answer_note(answer):
+    """Stands in for the answer, which the code context already holds"""
+    lines = [line.strip() for line in sanitize(answer).split('\n') if line.strip()]
+    if not lines:
+        return "(Nothing was written into the code)"
+    first = lines[0]
+    if len(first) > _SUMMARY_CHARS:
+        first = first[:_SUMMARY_CHARS - 3] + "..."
+    return f"(Written into the code: {len(lines)} lines, starting with `{first}`)"
+
+
+def _summary_item(request):
+    line = ' '.join(request.split())
+    if len(line) > _SUMMARY_CHARS:
+        # The request itself is at the end, just before the cursor
+        line = "..." + line[3 - _SUMMARY_CHARS:]
+    return f"- {line}"
+
+
+class Session:
+    """The earlier turns of one Text block and the summary of compacted ones"""
+
+    def __init__(self):
+        # (request excerpt, answer note), oldest first; never edited once added
+        self.turns = []
+        self.summary = []
+        self.chars = 0
+
+    def history(self):
+        """Chat messages of the earlier turns, to go after the system message"""
+        messages = []
+        for request, answer in self.turns:
+            messages.append({"role": "user", "content": _user_message(request)})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def summary_section(self):
+        """Text appended to the system message once turns were compacted"""
+        if not self.summary:
+            return ""
+        return ("\nEarlier requests in this session, already applied to the code:\n"
+                + '\n'.join(self.summary) + '\n')
+
+    def add(self, code_context, answer, max_tokens):
+        """Keep a finished request; compacts when the turns outgrow max_tokens"""
+        if not answer.strip():
+            return
+        request = request_excerpt(code_context)
+        answer = _answer_note(answer)
+        self.turns.append((request, answer))
+        self.chars += len(_user_message(request)) + len(answer)
+        stats["turns"] += 1
+        if self.chars > max_tokens * CHARS_PER_TOKEN:
+            self.compact(max_tokens // 2)
+
+    def compact(self, max_tokens):
+        """Move the oldest turns into the summary until the rest fits max_tokens"""
+        budget = max_tokens * CHARS_PER_TOKEN
+        while self.turns and self.chars > budget:
+            request, answer = self.turns.pop(0)
+            self.chars -= len(_user_message(request)) + len(answer)
+            self.summary.append(_summary_item(request))
+        del self.summary[:-SESSION_SUMMARY_ITEMS]
+        stats["compactions"] += 1
+
+    @property
+    def tokens(self):
+        return (self.chars + len(self.summary_section())) // CHARS_PER_TOKEN
+
+
+def get_session(text_name, create=True):
+    """The session of a Text block, or None when create is False and there is none"""
+    with _lock:
+        session = _sessions.get(text_name)
+        if session is None:
+            if not create:
+                return None
+            session = _sessions[text_name] = Session()
+            while len(_sessions) > SESSION_MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        _sessions.move_to_end(text_name)
+        return session
+
+
+def clear(text_name=None):
+    """Forget the session of one Text block, or all of them"""
+    with _lock:
+        if text_name is None:
+            _sessions.clear()
+        else:
+            _sessions.pop(text_name, None)
+
+
+def count():
+    with _lock:
+        return len(_sessions)
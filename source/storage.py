@@ -0,0 +1,15 @@
+import os
+
+import bpy
+
+
+def user_directory(name):
+    """Directory for the add-on's files in the user's Blender config, created on demand"""
+    package = __package__
+    try:
+        return bpy.utils.extension_path_user(package, path=name, create=True)
+    except ValueError:
+        # Installed as a legacy add-on rather than an extension
+        path = os.path.join(bpy.utils.user_resource('CONFIG', path=package), name)
+        os.makedirs(path, exist_ok=True)
+        return path
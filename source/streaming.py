@@ -0,0 +1,545 @@
+import codeop
+import json
+import re
+import time
+from operator import itemgetter
+
+_raw_decode_json = json.JSONDecoder().raw_decode
+
+
+def _stdlib_json_loads(data):
+    # Decoding first skips json.loads' encoding detection on bytes
+    return _raw_decode_json(data.decode('utf-8').strip())[0]
+
+
+try:
+    # Faster JSON decoding when the module is installed in Blender's Python
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = _stdlib_json_loads
+
+REASONING_HEADER = "# [Reasoning Process]:"
+CODE_HEADER = "# Code:"
+
+_READ_SIZE = 65536
+# Fence languages whose contents are kept as code; other blocks become comments
+_CODE_LANGUAGES = {'', 'python', 'py', 'python3'}
+_CONTINUATIONS = ('else', 'elif', 'except', 'finally')
+# An introduction like "Here is the updated script:": a sentence, no code punctuation
+_PROSE_RE = re.compile(r"[A-Z][A-Za-z0-9,'’!?-]* [A-Za-z0-9 ,'’!?-]*[:.!]")
+# Tokens that open or close strings and comments, and escaped characters
+_QUOTE_RE = re.compile(r"'''|\"\"\"|'|\"|#|\\.")
+# Longer unfinished statements are not checked, so a tick never recompiles much
+_MAX_STATEMENT_LINES = 400
+
+
+def advance_position(line, char, text):
+    """Return the (line, character) reached after writing text at (line, char)"""
+    newlines = text.count('\n')
+    if not newlines:
+        return line, char + len(text)
+    return line + newlines, len(text) - text.rfind('\n') - 1
+
+
+class StreamEvent(tuple):
+    """A queue event: ('reasoning' | 'content' | 'usage' | 'error' | 'done', data).
+
+    A plain tuple underneath, so events unpack and compare like before and
+    are built without a Python-level constructor call.
+    """
+    __slots__ = ()
+    kind = property(itemgetter(0))
+    data = property(itemgetter(1))
+
+
+class SSEParser:
+    """Incremental Server-Sent Events parser over raw byte chunks.
+
+    Lines may end in LF, CRLF or CR, also when split across chunks. The
+    'data' lines of an event are joined with newlines, 'event' and 'id'
+    fields are kept, lines starting with ':' (keep-alive comments) are
+    skipped and a blank line dispatches the event. The unfinished line
+    stays in one bytearray between chunks; complete lines are split off
+    in a single pass and their data is handed on as bytes.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data = []
+        self._event = None
+        self.last_event_id = None
+
+    def feed(self, chunk):
+        """The events completed by chunk, as (event type, data bytes) pairs"""
+        buffer = self._buffer
+        if not buffer and chunk.endswith(b'\n') and b'\r' not in chunk:
+            # Whole lines, the usual shape of a network read: no buffering
+            lines = chunk.split(b'\n')
+            lines.pop()
+        else:
+            buffer += chunk
+            held = False
+            if b'\r' in buffer:
+                if buffer[-1] == 13:
+                    # A CR at the end may be the first half of CRLF
+                    del buffer[-1]
+                    held = True
+                buffer[:] = buffer.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            lines = buffer.split(b'\n')
+            del buffer[:len(buffer) - len(lines.pop())]
+            if held:
+                buffer.append(13)
+
+        events = []
+        data = self._data
+        for line in lines:
+            if line.startswith(b'data: '):
+                # Nearly every line of a chat stream
+                data.append(line[6:])
+            elif line:
+                self._field(line)
+            else:
+                if data:
+                    events.append((self._event or 'message', data[0] if len(data) == 1 else b'\n'.join(data)))
+                    data.clear()
+                self._event = None
+        return events
+
+    def close(self):
+        """Events left when the stream ends without a final blank line"""
+        return self.feed(b'\n\n')
+
+    def _field(self, line):
+        field, _, value = line.partition(b':')
+        if not field:
+            return
+        if value.startswith(b' '):
+            value = value[1:]
+        if field == b'data':
+            self._data.append(value)
+        elif field == b'event':
+            self._event = value.decode('utf-8', 'replace')
+        elif field == b'id' and b'\0' not in value:
+            self.last_event_id = value.decode('utf-8', 'replace')
+        # 'retry' and unknown fields are ignored
+
+
+def iter_chunks(response):
+    """Body bytes of a streamed response as they arrive"""
+    raw = getattr(response, 'raw', None)
+    if raw is not None and not getattr(raw, 'chunked', True) and hasattr(raw, 'read1'):
+        # Without chunked encoding read() waits for a full block, read1() does not
+        while True:
+            data = raw.read1(_READ_SIZE)
+            if not data:
+                return
+            yield data
+    else:
+        # One piece per HTTP chunk, no matter how small
+        yield from response.iter_content(chunk_size=None)
+
+
+def _error_message(chunk):
+    error = chunk['error']
+    message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+    return f"API error: {message}"
+
+
+def iter_stream_events(response, trace=None):
+    """Parse an SSE chat or text completions response into queue events.
+
+    Yields ('reasoning' | 'content', fragment) for every non-empty delta,
+    ('usage', usage) when the provider reports token usage, ('error',
+    message) for malformed chunks and error events and finally ('done',
+    None) on [DONE], or ('error', ...) if the stream ended before it. The
+    time spent decoding chunks, not waiting for them, is added to the
+    'parse' span of trace.
+    """
+    parser = SSEParser()
+    done = False
+    chunks = iter_chunks(response)
+    while True:
+        chunk = next(chunks, None)
+        if trace is not None:
+            start = time.perf_counter()
+        events = []
+        for event_type, data in parser.feed(chunk) if chunk is not None else parser.close():
+            if event_type != 'message':
+                if event_type == 'error':
+                    events.append(StreamEvent(('error', f"API error: {data.decode('utf-8', 'replace')}")))
+                continue
+            if data.startswith(b'[DONE]'):
+                done = True
+                events.append(StreamEvent(('done', None)))
+                continue
+            try:
+                chunk_data = _json_loads(data)
+                if 'error' in chunk_data:
+                    events.append(StreamEvent(('error', _error_message(chunk_data))))
+                    continue
+                if chunk_data.get('usage'):
+                    events.append(StreamEvent(('usage', chunk_data['usage'])))
+                if not chunk_data['choices']:
+                    # The usage-only chunk some providers send at the end
+                    continue
+                choice = chunk_data['choices'][0]
+                delta = choice.get('delta')
+                if delta is not None:
+                    reasoning_content = delta.get('reasoning_content')
+                    response_content = delta.get('content')
+                else:
+                    # Text completions, like fill-in-the-middle, stream plain text
+                    reasoning_content = None
+                    response_content = choice['text']
+            except ValueError as e:
+                # json.JSONDecodeError and the fast decoders' errors are ValueErrors
+                print(f"Error decoding JSON: {e}\nReceived data: {bytes(data)[:200]!r}")
+                events.append(StreamEvent(('error', "Invalid JSON response")))
+                continue
+            except (KeyError, IndexError, AttributeError, TypeError) as e:
+                print(f"Unexpected response structure: {e}\nData: {bytes(data)[:200]!r}")
+                events.append(StreamEvent(('error', "Invalid response format")))
+                continue
+            if reasoning_content:
+                events.append(StreamEvent(('reasoning', reasoning_content)))
+            if response_content:
+                events.append(StreamEvent(('content', response_content)))
+        if trace is not None:
+            # Complete in the trace by the time 'done' is handled
+            trace.add('parse', time.perf_counter() - start)
+
+        for event in events:
+            if event[0] == 'done':
+                print("Stream successfully completed")
+            yield event
+        if chunk is None:
+            break
+        # After [DONE] the body is still read to its end so the
+        # connection goes back to the pool
+
+    if not done:
+        yield StreamEvent(('error', "Stream ended before completion"))
+
+
+def _open_string(line, quote):
+    """The triple quote left open after line, given the one open before it (or None)"""
+    single = None
+    for match in _QUOTE_RE.finditer(line):
+        token = match.group()
+        if token[0] == '\\':
+            continue
+        if quote:
+            if token == quote:
+                quote = None
+        elif single:
+            if token == single:
+                single = None
+        elif token == '#':
+            break
+        elif len(token) == 3:
+            quote = token
+        else:
+            single = token
+    return quote
+
+
+class StreamSanitizer:
+    """Turns the lines of a streamed answer into code, one complete line at a time.
+
+    Markdown fences are tracked as state instead of being cut out of every
+    line: a line starting with a fence opens or closes a block and is
+    dropped, unless a triple-quoted string is open, and its language tag
+    decides whether the block is code. A sentence before the first code
+    line, text after a closed block (the explanation models add despite
+    being asked not to) and blocks in other languages become comments.
+    Code itself is never changed: lines that do not compile are reported
+    in ``problems``. Code lines are grouped into top-level
+    statements; the ones completed since the last Text update are compiled
+    together, so syntax errors are found while the answer is still
+    streaming at the cost of one compile() of the new lines per tick.
+    """
+
+    def __init__(self):
+        self.fenced = False
+        self.language = ''
+        self.after_block = False
+        self.started = False
+        # (line number, message) of the statements that do not compile
+        self.problems = []
+        # (line number, line) of the statement being written
+        self._statement = []
+        # Statements complete but not compiled yet
+        self._complete = []
+        self._checkable = True
+        # Triple quote of the string left open by the last code line, if any
+        self._string = None
+        # Whether the last line started inside that string
+        self._quoted = False
+
+    @property
+    def in_code(self):
+        if self.fenced:
+            return self.language in _CODE_LANGUAGES
+        return not self.after_block
+
+    def line(self, line):
+        """The line as it should be written, or None for a fence marker"""
+        stripped = line.strip()
+        self._quoted = self._string is not None
+        if stripped.startswith('```') and not self._quoted:
+            if self.fenced:
+                self.fenced = False
+                self.after_block = True
+            else:
+                self.fenced = True
+                self.language = stripped[3:].strip().lower()
+            return None
+        if not self.in_code:
+            return self.preview(line)
+        if not self.started and not self.fenced and _PROSE_RE.fullmatch(stripped):
+            # An introduction like "Here is the code:" before any code
+            return f"# {stripped}"
+        if stripped:
+            self.started = True
+        self._string = _open_string(line, self._string)
+        # Trailing spaces inside a string are part of its value
+        return line.rstrip('\r') if self._quoted or self._string else line.rstrip()
+
+    def preview(self, line):
+        """How an unfinished line is shown for now, without changing the state"""
+        stripped = line.strip()
+        if self._string is not None:
+            return line.rstrip('\r')
+        if stripped.startswith('`'):
+            # Possibly a fence still arriving
+            return ""
+        if self.in_code:
+            return line.rstrip()
+        return f"# {stripped}" if stripped and not stripped.startswith('#') else stripped
+
+    def check(self, line, number):
+        """Add a written code line at text line number to the statement checks"""
+        stripped = line.strip()
+        if self._quoted and self._statement:
+            # Inside a triple-quoted string: part of the statement whatever it looks like
+            self._statement.append((number, line))
+            return
+        if not stripped or stripped.startswith('#') or not self.in_code:
+            return
+        top_level = not line[0].isspace()
+        if top_level and self._statement and not stripped.startswith(_CONTINUATIONS) \
+                and stripped[0] not in ')]}':
+            self._end_statement()
+        if not self._statement:
+            # Code continuing the user's indented block cannot be checked on its own
+            self._checkable = top_level
+        self._statement.append((number, line))
+        if len(self._statement) > _MAX_STATEMENT_LINES:
+            self._statement.clear()
+
+    def _end_statement(self):
+        if self._checkable and len(self._statement) <= _MAX_STATEMENT_LINES:
+            self._complete.append(self._statement)
+        self._statement = []
+
+    def verify(self, final=False):
+        """Compile the statements completed since the last call; final also checks the last one.
+
+        They are compiled together, which is enough when they are fine;
+        only a batch with an error is looked at statement by statement.
+        """
+        if final and self._statement:
+            self._end_statement()
+        statements, self._complete = self._complete, []
+        if not statements:
+            return
+        try:
+            compile('\n'.join(line for statement in statements for _, line in statement), "<stream>", 'exec')
+            return
+        except (SyntaxError, ValueError, OverflowError):
+            pass
+        carry = []
+        for index, statement in enumerate(statements):
+            lines = carry + statement
+            carry = []
+            last = index == len(statements) - 1
+            if not self._compile(lines, final and last) and len(lines) <= _MAX_STATEMENT_LINES:
+                # A top-level line that continues an open bracket or string
+                carry = lines
+        if carry:
+            self._statement = carry + self._statement
+
+    def _compile(self, lines, final):
+        """Record the syntax error of lines; False if they are only unfinished"""
+        source = '\n'.join(line for _, line in lines)
+        try:
+            if final:
+                compile(source, "<stream>", 'exec')
+            elif codeop.compile_command(source + '\n', "<stream>", 'exec') is None:
+                return False
+        except (SyntaxError, ValueError, OverflowError) as e:
+            offset = min(max((getattr(e, 'lineno', None) or 1) - 1, 0), len(lines) - 1)
+            self.problems.append((lines[offset][0], getattr(e, 'msg', None) or str(e)))
+        return True
+
+
+def sanitize(text):
+    """The code in a complete answer, cleaned the same way as a streamed one"""
+    sanitizer = StreamSanitizer()
+    lines = (sanitizer.line(line) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line is not None)
+
+
+class TextStreamWriter:
+    """Append streamed fragments to a Text datablock without rewriting it.
+
+    Fragments are fed as ('reasoning' | 'content', text) deltas, each kind
+    under its own comment header unless ``headers`` is False. Complete
+    lines are cleaned and written once; only the unfinished last line is
+    replaced when more of it arrives, so the total work is linear in the
+    size of the generated output and the user's code is never re-serialised.
+    Content goes through a StreamSanitizer; its ``problems`` are the syntax
+    errors found so far, by line of the Text block.
+    """
+
+    def __init__(self, text_block, headers=True):
+        self.text_block = text_block
+        self.headers = headers
+        lines = text_block.lines
+        self.line = len(lines) - 1
+        self.char = len(lines[self.line].body)
+
+        # Separate the generated output from the existing code by one blank line
+        trailing = 0
+        while trailing <= self.line and not lines[self.line - trailing].body.strip():
+            trailing += 1
+        if trailing > self.line:
+            self._lead = ""
+        else:
+            self._lead = "\n" * max(0, 2 - trailing)
+
+        self.sanitizer = StreamSanitizer()
+        self._reported = 0
+        # Line the end of the committed output will be on once written
+        self._end_line = self.line
+        self._fresh = True
+        self.section = None
+        self.kind = None
+        self.partial = ""
+        # Blank code lines since the last written one
+        self._blanks = 0
+        self._out = []
+        self._shown = ""
+        self._dirty = False
+
+    def feed(self, kind, fragment):
+        """Queue a new fragment; nothing is written until flush()"""
+        if not fragment:
+            return
+        if kind != self.kind and self.partial:
+            self._commit_line(self.kind, self.partial)
+            self.partial = ""
+        self.kind = kind
+
+        lines = (self.partial + fragment).split('\n')
+        self.partial = lines.pop()
+        for line in lines:
+            self._commit_line(kind, line)
+        self._dirty = True
+
+    def finish(self):
+        """Commit the unfinished line and write everything still pending"""
+        if self.partial:
+            self._commit_line(self.kind, self.partial)
+            self.partial = ""
+            self._dirty = True
+        self.sanitizer.verify(final=True)
+        return self.flush()
+
+    @property
+    def problems(self):
+        return self.sanitizer.problems
+
+    def new_problems(self):
+        """Syntax problems found since the last call, as (line, message)"""
+        problems = self.sanitizer.problems[self._reported:]
+        self._reported += len(problems)
+        return problems
+
+    def flush(self):
+        """Write pending output to the Text block; returns True if it changed"""
+        if not self._dirty:
+            return False
+        self._dirty = False
+        self.sanitizer.verify()
+
+        display = self._clean(self.kind, self.partial) if self.partial else None
+        if display:
+            self._ensure_section(self.kind)
+            display = self._line_prefix(consume=False) + display
+        else:
+            display = ""
+
+        committed = ''.join(self._out)
+        self._out.clear()
+        if not committed and display == self._shown:
+            return False
+
+        end_line, end_char = advance_position(self.line, self.char, self._shown)
+        self.text_block.select_set(self.line, self.char, end_line, end_char)
+        self.text_block.write(committed + display)
+
+        self.line, self.char = advance_position(self.line, self.char, committed)
+        self._shown = display
+        return True
+
+    def _clean(self, kind, line):
+        if kind == 'reasoning':
+            if not line.strip():
+                return ""
+            return line if line.startswith('#') else f"# {line}"
+        return self.sanitizer.preview(line)
+
+    def _ensure_section(self, kind):
+        if self.section == kind:
+            return
+        if self.headers:
+            header = REASONING_HEADER if kind == 'reasoning' else CODE_HEADER
+            self._emit(self._lead + header)
+            self._lead = "\n\n"
+            self._fresh = False
+        self.section = kind
+        self._blanks = 0
+
+    def _line_prefix(self, consume=True):
+        if self._fresh:
+            prefix = self._lead
+        else:
+            prefix = "\n" * (1 + self._blanks)
+        if consume:
+            self._fresh = False
+            self._blanks = 0
+        return prefix
+
+    def _emit(self, text):
+        self._out.append(text)
+        self._end_line += text.count('\n')
+
+    def _commit_line(self, kind, line):
+        if kind == 'content':
+            cleaned = self.sanitizer.line(line)
+            if cleaned is None:
+                # Fence markers disappear entirely
+                return
+        else:
+            cleaned = self._clean(kind, line)
+        if not cleaned:
+            # Blank reasoning lines disappear; blank code lines are kept, except before the first one
+            if kind == 'content' and self.section == kind:
+                self._blanks += 1
+            return
+        self._ensure_section(kind)
+        self._emit(self._line_prefix() + cleaned)
+        if kind == 'content':
+            self.sanitizer.check(cleaned, self._end_line)
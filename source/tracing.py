@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import bpy
+
+from .config import CHARS_PER_TOKEN, TRACE_BUFFER_SIZE
+
+# Spans in display order: durations, except ttft which is measured from
+# the start of the request (the key press) like the user perceives it
+SPANS = ("checks", "context", "scene", "queue", "connect", "ttft", "parse", "apply", "total")
+
+# Finished traces of the session, newest last
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+class Trace:
+    """Timings of one request from key press to the last UI update.
+
+    Worker threads and the modal operator write different spans, so no
+    lock is needed while the request runs.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.chars = 0
+        self.streamed = None
+        self.cached = False
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def observe(self, event):
+        """Note a stream event as it arrives from the provider"""
+        kind, data = event
+        if kind in ('reasoning', 'content'):
+            self.spans.setdefault('ttft', time.perf_counter() - self.started)
+            self.chars += len(data)
+        elif kind == 'done':
+            self.streamed = time.perf_counter() - self.started
+
+
+def log_path(prefs):
+    """Absolute path of the JSONL trace log, or "" when logging is off"""
+    return bpy.path.abspath(prefs.trace_log_path) if prefs.trace_log_path else ""
+
+
+def finish(trace, status, completion_tokens=None, log_path=""):
+    """Close trace, keep it in the ring buffer and append it to log_path as JSON"""
+    trace.spans['total'] = time.perf_counter() - trace.started
+    record = {
+        "kind": trace.kind,
+        "status": status,
+        "cached": trace.cached,
+        "time": time.time(),
+        "spans_ms": {name: round(trace.spans[name] * 1000, 2) for name in SPANS if name in trace.spans},
+    }
+    first_token = trace.spans.get('ttft')
+    if trace.streamed is not None and first_token is not None and trace.streamed > first_token:
+        tokens = completion_tokens or trace.chars // CHARS_PER_TOKEN
+        record["tokens"] = tokens
+        record["tokens_per_s"] = round(tokens / (trace.streamed - first_token), 1)
+    with _lock:
+        _traces.append(record)
+
+    if log_path:
+        try:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"[DeepSeek] Could not write the trace log: {e}")
+    return record
+
+
+def format_value(value, unit):
+    return f"{value:.1f} {unit}" if value < 10 else f"{value:.0f} {unit}"
+
+
+def percentile(ordered, fraction):
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def summary():
+    """{kind: (request count, [(metric, unit, p50, tail name, tail)])} over the ring buffer.
+
+    The tail is the slow end: p95 for times, p5 for tokens/s. Cached
+    replays are left out, they would hide the provider's latency.
+    """
+    with _lock:
+        traces = [record for record in _traces if not record["cached"]]
+    by_kind = {}
+    for record in traces:
+        by_kind.setdefault(record["kind"], []).append(record)
+
+    result = {}
+    for kind, records in by_kind.items():
+        rows = []
+        for name in SPANS:
+            values = sorted(r["spans_ms"][name] for r in records if name in r["spans_ms"])
+            if values:
+                rows.append((name, "ms", percentile(values, 0.5), "p95", percentile(values, 0.95)))
+        rates = sorted(r["tokens_per_s"] for r in records if "tokens_per_s" in r)
+        if rates:
+            rows.append(("tokens/s", "tok/s", percentile(rates, 0.5), "p5", percentile(rates, 0.05)))
+        result[kind] = (len(records), rows)
+    return result
+
+
+def clear():
+    with _lock:
+        _traces.clear()
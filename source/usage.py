@@ -0,0 +1,38 @@
+# Token usage reported by the provider, accumulated for the current session
+stats = {
+    "requests": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "cache_hit_tokens": 0,
+    "cache_miss_tokens": 0,
+}
+
+
+def normalize(usage):
+    """Map DeepSeek and OpenAI usage blocks to (prompt, completion, hit, miss) tokens"""
+    prompt = usage.get("prompt_tokens") or 0
+    completion = usage.get("completion_tokens") or 0
+    if "prompt_cache_hit_tokens" in usage:
+        hit = usage.get("prompt_cache_hit_tokens") or 0
+        miss = usage.get("prompt_cache_miss_tokens") or 0
+    else:
+        details = usage.get("prompt_tokens_details") or {}
+        hit = details.get("cached_tokens") or 0
+        miss = prompt - hit
+    return prompt, completion, hit, miss
+
+
+def record(usage):
+    prompt, completion, hit, miss = normalize(usage)
+    stats["requests"] += 1
+    stats["prompt_tokens"] += prompt
+    stats["completion_tokens"] += completion
+    stats["cache_hit_tokens"] += hit
+    stats["cache_miss_tokens"] += miss
+    print(f"[DeepSeek] Usage: {prompt} prompt tokens ({hit} cached), {completion} completion tokens")
+    return prompt, completion, hit, miss
+
+
+def hit_rate():
+    total = stats["cache_hit_tokens"] + stats["cache_miss_tokens"]
+    return stats["cache_hit_tokens"] / total if total else 0.0
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import traceback
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from .config import WORKER_THREADS
+
+_loop = None
+_thread = None
+_executor = None
+_lock = threading.Lock()
+
+
+def start():
+    """Start the background event loop and its thread pool if needed, and return the loop.
+
+    Called from register(); submit() also starts it on demand, for batch
+    runs and scripts that import the add-on without registering it.
+    """
+    global _loop, _thread, _executor
+    with _lock:
+        if _loop is not None:
+            return _loop
+        _executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="deepseek-worker")
+        _loop = asyncio.new_event_loop()
+        _loop.set_default_executor(_executor)
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(_loop)
+            _loop.call_soon(ready.set)
+            _loop.run_forever()
+
+        _thread = threading.Thread(target=run, name="deepseek-loop", daemon=True)
+        _thread.start()
+        ready.wait()
+        return _loop
+
+
+def _report(future):
+    try:
+        future.result()
+    except CancelledError:
+        pass
+    except Exception:
+        print("[DeepSeek] Unhandled error in a background request:")
+        traceback.print_exc()
+
+
+def submit(func, *args):
+    """Run func(*args) in the background and return a concurrent.futures.Future.
+
+    Coroutine functions run on the event loop itself, so waiting in them
+    costs no thread; blocking functions such as a streamed HTTP request run
+    in the bounded pool, where calls beyond WORKER_THREADS wait their turn.
+    """
+    loop = start()
+    future = asyncio.run_coroutine_threadsafe(_call(func, args), loop)
+    future.add_done_callback(_report)
+    return future
+
+
+async def _call(func, args):
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def stop():
+    """Cancel what is still running, stop the loop and release the pool"""
+    global _loop, _thread, _executor
+    with _lock:
+        loop, thread, executor = _loop, _thread, _executor
+        _loop = _thread = _executor = None
+    if loop is None:
+        return
+
+    def shutdown():
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.stop()
+
+    loop.call_soon_threadsafe(shutdown)
+    # Jobs are cancelled first, so streams fail fast and the loop stops quickly
+    thread.join(timeout=2.0)
+    executor.shutdown(wait=False, cancel_futures=True)
+    if not thread.is_alive():
+        loop.close()